@@ -0,0 +1,49 @@
+"""Overdue ageing buckets.
+
+Bucket boundaries come from AGEING_BUCKET_EDGES, a comma separated list of
+inclusive upper bounds in days. The default "30,60,90" gives 0-30, 31-60,
+61-90 and 90+ days; adding a range is a config change, not a code change.
+"""
+import os
+from typing import List, Optional
+
+from sqlalchemy import case
+
+
+def parse_bucket_edges(spec: str) -> List[dict]:
+    edges = sorted({int(edge) for edge in spec.split(",") if edge.strip()})
+    buckets, low = [], 0
+    for edge in edges:
+        buckets.append({"label": f"{low}-{edge} days", "min": low, "max": edge})
+        low = edge + 1
+    buckets.append({"label": f"{low - 1}+ days" if edges else "0+ days", "min": low, "max": None})
+    return buckets
+
+
+AGEING_BUCKETS = parse_bucket_edges(os.getenv("AGEING_BUCKET_EDGES", "30,60,90"))
+
+# Cases overdue past these many days count as SLA breaches / critical breaches
+SLA_BREACH_DAYS = 90
+SLA_CRITICAL_DAYS = 120
+
+
+def bucket_index(overdue_days: Optional[int]) -> Optional[int]:
+    """Index into AGEING_BUCKETS for one case, or None if it has no bucket"""
+    if overdue_days is None or overdue_days < 0:
+        return None
+    for i, bucket in enumerate(AGEING_BUCKETS):
+        if bucket["max"] is None or overdue_days <= bucket["max"]:
+            return i
+    return None
+
+
+def bucket_expression(overdue_days_column):
+    """SQL CASE expression computing bucket_index() inside the database"""
+    whens = [
+        (overdue_days_column <= bucket["max"], i)
+        for i, bucket in enumerate(AGEING_BUCKETS)
+        if bucket["max"] is not None
+    ]
+    if not whens:
+        return case((overdue_days_column >= 0, 0), else_=None)
+    return case(*whens, else_=len(AGEING_BUCKETS) - 1)
@@ -0,0 +1,49 @@
+"""Collision-free, monotonic case ids.
+
+Ids are CASE-<n> where n comes from a counter row in `id_sequences`.
+Reserving a block bumps the counter inside the caller's transaction, so the
+row lock serializes concurrent writers (in any number of workers) and a
+rolled-back insert also rolls back its reservation.
+"""
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .database import Case, IdSequence
+
+CASE_ID_PREFIX = "CASE-"
+SEQUENCE_NAME = "cases"
+
+# Never hand out numbers below this; the old scheme used random 1000-9999
+FIRST_CASE_NUMBER = 10000
+
+
+def ensure_case_id_sequence(db: Session) -> None:
+    """Create the counter above every existing CASE-<n> id; the caller commits"""
+    if db.get(IdSequence, SEQUENCE_NAME) is not None:
+        return
+    highest = FIRST_CASE_NUMBER - 1
+    ids = db.execute(select(Case.id).where(Case.id.like(f"{CASE_ID_PREFIX}%"))).scalars()
+    for case_id in ids:
+        suffix = case_id[len(CASE_ID_PREFIX):]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    db.add(IdSequence(name=SEQUENCE_NAME, next_value=highest + 1))
+    db.flush()
+
+
+def reserve_case_ids(db: Session, count: int) -> list:
+    """Reserve `count` consecutive case ids; the caller commits"""
+    if count <= 0:
+        return []
+    result = db.execute(
+        update(IdSequence)
+        .where(IdSequence.name == SEQUENCE_NAME)
+        .values(next_value=IdSequence.next_value + count)
+    )
+    if result.rowcount == 0:
+        ensure_case_id_sequence(db)
+        return reserve_case_ids(db, count)
+    end = db.execute(
+        select(IdSequence.next_value).where(IdSequence.name == SEQUENCE_NAME)
+    ).scalar_one()
+    return [f"{CASE_ID_PREFIX}{n}" for n in range(end - count, end)]
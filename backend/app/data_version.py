@@ -0,0 +1,39 @@
+"""A counter that changes whenever case data does.
+
+Every case write goes through rollup.apply_deltas() or rollup.rebuild(),
+which bump the `data_version` row in `id_sequences` inside the same
+transaction. HTTP handlers use the current value as their ETag (see
+http_cache.py), so an unchanged book revalidates with one primary-key read.
+The rollup's "total" row is already updated on every write, so this adds
+no new lock contention.
+"""
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .database import IdSequence
+
+SEQUENCE_NAME = "data_version"
+
+
+def ensure_data_version(db: Session) -> None:
+    """Create the counter on first start; the caller commits"""
+    if db.get(IdSequence, SEQUENCE_NAME) is None:
+        db.add(IdSequence(name=SEQUENCE_NAME, next_value=1))
+        db.flush()
+
+
+def bump(db: Session) -> None:
+    """Mark case data as changed; the caller commits"""
+    result = db.execute(
+        update(IdSequence)
+        .where(IdSequence.name == SEQUENCE_NAME)
+        .values(next_value=IdSequence.next_value + 1)
+    )
+    if result.rowcount == 0:
+        ensure_data_version(db)
+
+
+async def current(db: AsyncSession) -> int:
+    version = await db.scalar(select(IdSequence.next_value).where(IdSequence.name == SEQUENCE_NAME))
+    return version or 0
@@ -1,15 +1,19 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Index, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+from .engine import DATABASE_URL, make_async_engine, make_engine
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./fedex_dca.db"
+# Connection settings come from the environment; see engine.py
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = make_async_engine(SQLALCHEMY_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 class Case(Base):
@@ -25,10 +29,22 @@ class Case(Base):
     recovery_probability = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Day overdue_days was last brought up to date (see sla.py)
+    overdue_as_of = Column(Date, default=lambda: datetime.utcnow().date(), index=True)
     
     # Relationships
     sla = relationship("SLA", back_populates="case", uselist=False)
 
+    # Cover the case list's filters and keyset sort orders; id breaks ties
+    __table_args__ = (
+        Index("ix_cases_overdue_days_id", "overdue_days", "id"),
+        Index("ix_cases_amount_id", "amount", "id"),
+        Index("ix_cases_created_at_id", "created_at", "id"),
+        Index("ix_cases_status_priority_overdue", "status", "priority", "overdue_days", "id"),
+        Index("ix_cases_priority_overdue", "priority", "overdue_days", "id"),
+        Index("ix_cases_dca_status_overdue", "dca_assigned", "status", "overdue_days", "id"),
+    )
+
 class DCA(Base):
     __tablename__ = "dcas"
 
@@ -43,14 +59,53 @@ class SLA(Base):
     __tablename__ = "slas"
 
     id = Column(Integer, primary_key=True, index=True)
-    case_id = Column(String, ForeignKey("cases.id"))
-    sla_deadline = Column(DateTime)
+    case_id = Column(String, ForeignKey("cases.id"), index=True)
+    sla_deadline = Column(DateTime, index=True)
     is_breached = Column(Boolean, default=False)
+    is_critical = Column(Boolean, default=False)
     
     # Relationships
     # Relationships
     case = relationship("Case", back_populates="sla")
 
+class AnalyticsRollup(Base):
+    """Pre-aggregated case totals, kept in step with case writes (see rollup.py)"""
+    __tablename__ = "analytics_rollup"
+
+    dimension = Column(String, primary_key=True)  # total, bucket, status, priority, dca, sla
+    key = Column(String, primary_key=True)
+    case_count = Column(Integer, default=0, nullable=False)
+    total_amount = Column(Float, default=0, nullable=False)
+    recovery_sum = Column(Float, default=0, nullable=False)
+    recovery_count = Column(Integer, default=0, nullable=False)
+
+class IdSequence(Base):
+    """Named counters for human-readable ids (see case_ids.py)"""
+    __tablename__ = "id_sequences"
+
+    name = Column(String, primary_key=True)
+    next_value = Column(Integer, nullable=False)
+
+class CaseLease(Base):
+    """Exclusive claims on cases handed out by the work queue (see work_queue.py)"""
+    __tablename__ = "case_leases"
+
+    case_id = Column(String, ForeignKey("cases.id"), primary_key=True)
+    lease_id = Column(String, unique=True, index=True, nullable=False)
+    agent = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    acked = Column(Boolean, default=False, nullable=False)
+
+class JobState(Base):
+    """Progress of background jobs, shared by every worker"""
+    __tablename__ = "job_state"
+
+    name = Column(String, primary_key=True)
+    last_run_at = Column(DateTime)
+    # Resumable jobs: last key committed by an unfinished run, and rows done
+    cursor = Column(String)
+    processed = Column(Integer)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -68,5 +123,25 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _add_missing_columns():
+    """ALTER TABLE in columns added to the models since the table was created"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    # create_all skips tables that already exist, so add any new indexes too
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
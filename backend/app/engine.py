@@ -0,0 +1,187 @@
+"""Environment-driven engine factory with SQLite tuning and pool counters
+
+Settings (all optional):
+
+    DATABASE_URL               sqlite:///./fedex_dca.db
+    DB_POOL_SIZE               connections kept open per engine (5)
+    DB_MAX_OVERFLOW            extra connections allowed under load (10)
+    DB_POOL_TIMEOUT            seconds to wait for a free connection (30)
+    DB_POOL_RECYCLE_SECONDS    reopen connections older than this, -1 = never (-1)
+    DB_POOL_PRE_PING           test connections on checkout (0)
+    SQLITE_JOURNAL_MODE        WAL lets readers run alongside a writer (WAL)
+    SQLITE_SYNCHRONOUS         NORMAL is safe under WAL and skips most fsyncs (NORMAL)
+    SQLITE_BUSY_TIMEOUT_MS     wait this long for a lock before "database is locked" (5000)
+    SQLITE_CACHE_SIZE_KB       page cache per connection (65536)
+    SQLITE_MMAP_SIZE_MB        memory-mapped I/O window (256)
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./fedex_dca.db")
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "-1"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0").lower() in ("1", "true", "yes")
+
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    # negative cache_size is in KiB rather than pages
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE_MB", "256")) * 1024 * 1024,
+}
+
+# asyncio drivers for the same databases; used by the request handlers so
+# queries don't tie up the event loop or a threadpool slot
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+class PoolStats:
+    """Checkout, wait and overflow counters for one engine's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_overflow = 0
+
+    def record_checkout(self, overflow: int, waited: float = None) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.peak_overflow = max(self.peak_overflow, overflow)
+            if waited is not None:
+                self.waits += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 4),
+            "max_wait_seconds": round(self.max_wait_seconds, 4),
+            "peak_overflow": self.peak_overflow,
+        }
+
+
+class _CountingPoolMixin:
+    """Counts checkouts on a QueuePool and times the ones that had to wait.
+
+    A checkout waits when no idle connection is left and the overflow limit
+    is reached, so it blocks until another request checks one back in.
+    """
+
+    stats: PoolStats
+
+    def _do_get(self):
+        saturated = (
+            self._max_overflow > -1
+            and self._pool.empty()
+            and self._overflow >= self._max_overflow
+        )
+        start = time.perf_counter()
+        connection = super()._do_get()
+        self.stats.record_checkout(
+            max(self.overflow(), 0),
+            time.perf_counter() - start if saturated else None,
+        )
+        return connection
+
+    def _do_return_conn(self, record):
+        self.stats.record_checkin()
+        super()._do_return_conn(record)
+
+
+def _counting_pool(base, stats: PoolStats):
+    # Pool.recreate() (on dispose) builds a new instance of the same class,
+    # so the counters live on a per-engine subclass rather than the instance
+    return type(f"Counting{base.__name__}", (_CountingPoolMixin, base), {"stats": stats})
+
+
+def _is_file_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _pool_options(url, base):
+    if url.get_backend_name() == "sqlite" and not _is_file_sqlite(url):
+        # In-memory databases live and die with their one connection
+        return {}, None
+    stats = PoolStats()
+    return {
+        "poolclass": _counting_pool(base, stats),
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": POOL_PRE_PING,
+    }, stats
+
+
+def _install_sqlite_pragmas(engine: Engine) -> None:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def make_engine(url: str = DATABASE_URL) -> Engine:
+    url = make_url(url)
+    options, stats = _pool_options(url, QueuePool)
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    engine = create_engine(url, **options)
+    engine.pool_stats = stats
+    if _is_file_sqlite(url):
+        _install_sqlite_pragmas(engine)
+    return engine
+
+
+def make_async_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    url = async_url(url)
+    options, stats = _pool_options(url, AsyncAdaptedQueuePool)
+    engine = create_async_engine(url, **options)
+    engine.sync_engine.pool_stats = stats
+    if _is_file_sqlite(url):
+        _install_sqlite_pragmas(engine.sync_engine)
+    return engine
+
+
+def pool_status(engine: Engine) -> dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__, "status": pool.status()}
+    stats = getattr(engine, "pool_stats", None)
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
@@ -0,0 +1,119 @@
+"""In-process publisher for live case and KPI updates.
+
+The case routes publish an event for every create, update and allocation,
+carrying the case and its rollup deltas so dashboards can patch their
+totals instead of re-fetching /api/analytics/summary. Bulk writes (ingest,
+batch allocation, SLA ageing) publish a single "resync" event instead.
+
+Each subscriber has a bounded buffer of EVENT_BUFFER_SIZE (256) events. A
+publisher never waits on a slow subscriber; when a buffer is full the
+backpressure policy applies:
+
+    resync       drop the buffered events and queue one "resync" event, so
+                 the client re-fetches full state and carries on (default)
+    disconnect   end the subscriber's stream
+
+Events are per worker: with several uvicorn workers a subscriber only sees
+writes handled by its own worker, plus any resync.
+"""
+import asyncio
+import itertools
+import os
+from typing import Optional
+
+from . import rollup
+from .models import CaseResponse
+
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "256"))
+EVENT_OVERFLOW_POLICY = os.getenv("EVENT_OVERFLOW_POLICY", "resync")
+if EVENT_OVERFLOW_POLICY not in ("resync", "disconnect"):
+    raise ValueError(f"EVENT_OVERFLOW_POLICY must be resync or disconnect, not {EVENT_OVERFLOW_POLICY!r}")
+
+# Queued in place of a subscriber's events to end its stream
+CLOSE = None
+
+
+class Subscriber:
+    def __init__(self, buffer_size: int):
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.overflows = 0
+
+
+class EventBroker:
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE, policy: str = EVENT_OVERFLOW_POLICY):
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.overflows = 0
+        self.disconnects = 0
+
+    def subscribe(self) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(self.buffer_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def publish(self, kind: str, data: dict) -> None:
+        """Fan an event out to every subscriber; call from the event loop"""
+        event = {"id": next(self._ids), "type": kind, "data": data}
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._overflow(subscriber)
+
+    def publish_threadsafe(self, kind: str, data: dict) -> None:
+        """publish() from a threadpool route or background thread"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.publish, kind, data)
+
+    def status(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "buffer_size": self.buffer_size,
+            "policy": self.policy,
+            "published": self.published,
+            "overflows": self.overflows,
+            "disconnects": self.disconnects,
+        }
+
+    def _overflow(self, subscriber: Subscriber) -> None:
+        self.overflows += 1
+        subscriber.overflows += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        if self.policy == "disconnect":
+            self.disconnects += 1
+            self._subscribers.discard(subscriber)
+            subscriber.queue.put_nowait(CLOSE)
+        else:
+            subscriber.queue.put_nowait(
+                {"id": next(self._ids), "type": "resync", "data": {"reason": "subscriber_lagging"}}
+            )
+
+
+broker = EventBroker()
+
+
+def publish_case_change(action: str, case, old: Optional[dict]) -> None:
+    """Publish a case event with the KPI deltas of moving from `old` to the case's current state"""
+    deltas = rollup.new_deltas()
+    rollup.accumulate(deltas, old, rollup.snapshot(case))
+    kpi_delta = [
+        {"dimension": dimension, "key": key, "count": count, "amount": amount,
+         "recovery_sum": recovery_sum, "recovery_count": recovery_count}
+        for (dimension, key), (count, amount, recovery_sum, recovery_count) in deltas.items()
+        if count or amount or recovery_sum or recovery_count
+    ]
+    broker.publish("case", {
+        "action": action,
+        "case": CaseResponse.model_validate(case).model_dump(mode="json"),
+        "kpi_delta": kpi_delta,
+    })
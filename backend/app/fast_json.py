@@ -0,0 +1,60 @@
+"""Fast JSON encoding for the large list endpoints.
+
+With FAST_JSON=1 the case list and search endpoints select plain column
+tuples and encode them straight to JSON, skipping the per-row pydantic
+model and jsonable_encoder pass; the analytics router renders its dicts the
+same way. The routes keep their response_model, so the OpenAPI schema is
+unchanged, and the output is the same JSON the models would produce.
+
+orjson is used when installed; otherwise the stdlib encoder (slower, but
+still skips model construction).
+"""
+import json
+import os
+from datetime import date, datetime
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# Response class for routers returning plain dicts and lists
+ResponseClass = FastJSONResponse if FAST_JSON else JSONResponse
+
+
+def rows_response(fields, rows, response: Response) -> Response:
+    """Encode column tuples as a list of objects keyed by `fields`.
+
+    A returned Response bypasses response_model validation, and also the
+    headers that dependencies set on the injected `response` (ETag,
+    X-Next-Cursor), so those are copied over here.
+    """
+    result = FastJSONResponse([dict(zip(fields, row)) for row in rows])
+    result.raw_headers.extend(
+        (name, value) for name, value in response.raw_headers
+        if name not in (b"content-length", b"content-type")
+    )
+    return result
@@ -0,0 +1,143 @@
+"""HTTP caching and compression for the read endpoints.
+
+Routes opt in with a dependency carrying their Cache-Control policy:
+
+    @router.get("/summary", dependencies=[cached(ANALYTICS_CACHE)])
+
+The dependency sets a weak ETag from the data version counter and, when the
+request's If-None-Match already has it, answers 304 before the handler runs
+its query.
+
+CompressionMiddleware gzips (or, with the brotli package installed and
+`br` accepted, brotli-compresses) responses of at least
+COMPRESSION_MIN_BYTES (1024). Streamed bodies are compressed chunk by chunk
+and flushed as they go. Event streams and bodies that already carry a
+Content-Encoding (the gzipped case export) pass through untouched.
+"""
+import os
+import zlib
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import Headers, MutableHeaders
+
+from . import data_version
+from .database import get_async_db
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Case data: always revalidate, which is one PK lookup when nothing changed
+CASES_CACHE = "private, no-cache"
+# Dashboard aggregates: a few seconds stale is fine
+ANALYTICS_CACHE = "public, max-age=10, stale-while-revalidate=30"
+# Demo data that never changes between deploys
+STATIC_CACHE = "public, max-age=300"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison: W/"7" matches "7", as If-None-Match requires
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def cached(cache_control: str):
+    """Route dependency adding ETag/Cache-Control and answering 304s"""
+    async def validate(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+        etag = f'W/"{await data_version.current(db)}"'
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return Depends(validate)
+
+
+def _choose_encoding(accept_encoding: str):
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._br = None
+            self._gzip = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, last: bool) -> bytes:
+        if self._br is not None:
+            return self._br.process(data) + (self._br.finish() if last else self._br.flush())
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    "content-encoding" in headers
+                    or headers.get("content-type", "").startswith("text/event-stream")
+                    or message["status"] in (204, 304)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Hold the headers until the first chunk shows whether to compress
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                await send(start)
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, last=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,216 @@
+"""Streaming bulk case ingestion.
+
+Reads a CSV or NDJSON placement file record by record, validates it in
+chunks, optionally fills in priority/recovery probability with one
+vectorized model call per chunk, and inserts each chunk with a single
+executemany. Each chunk commits on its own, together with its id
+reservation and rollup deltas, so memory stays flat for any file size and a
+bad chunk doesn't lose the rest of the file.
+
+    python -m app.ingest placements.csv [--score] [--format ndjson]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import IO, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import rollup
+from .case_ids import reserve_case_ids
+from .database import Case, DCA
+from .model_registry import registry
+from .models import CaseIngestRecord
+from .scoring import build_matrix, score_priority, score_recovery
+
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "5000"))
+MAX_REPORTED_ERRORS = 1000
+
+CASE_COLUMNS = ("customer_name", "amount", "overdue_days", "status", "priority",
+                "dca_assigned", "recovery_probability")
+
+
+class IngestReport:
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.first_id = None
+        self.last_id = None
+        self._started = time.perf_counter()
+
+    def error(self, row: int, message) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def as_dict(self) -> dict:
+        elapsed = time.perf_counter() - self._started
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "first_id": self.first_id,
+            "last_id": self.last_id,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.received / elapsed, 1) if elapsed else None,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl", ".json")) or "json" in (content_type or ""):
+        return "ndjson"
+    return "csv"
+
+
+def iter_records(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (row number, dict or error message) without reading the whole file"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            for row_number, row in enumerate(csv.DictReader(text), start=1):
+                # Empty CSV cells mean "not given", not empty strings
+                yield row_number, {k: v for k, v in row.items() if k and v not in ("", None)}
+            return
+
+        row_number = 0
+        for line in text:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row_number, f"invalid JSON: {e}"
+                continue
+            yield row_number, record if isinstance(record, dict) else "expected a JSON object"
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validate(chunk, report: IngestReport, dca_names: set, score: bool) -> List[Tuple[int, CaseIngestRecord]]:
+    valid = []
+    for row_number, raw in chunk:
+        report.received += 1
+        if isinstance(raw, str):
+            report.error(row_number, raw)
+            continue
+        try:
+            record = CaseIngestRecord.model_validate(raw)
+        except ValidationError as e:
+            report.error(row_number, e.errors(include_url=False, include_context=False))
+            continue
+        if record.dca_assigned and record.dca_assigned not in dca_names:
+            report.error(row_number, f"unknown DCA {record.dca_assigned!r}")
+        elif record.priority is None and not score:
+            report.error(row_number, "priority is required unless score=true")
+        else:
+            valid.append((row_number, record))
+    return valid
+
+
+def _fill_scores(records: List[CaseIngestRecord]) -> None:
+    """Fill missing priority / recovery probability with one model call each"""
+    missing = [r for r in records if r.priority is None or r.recovery_probability is None]
+    if not missing:
+        return
+    models = registry.get()
+    features = build_matrix(missing)
+    priority, _ = score_priority(models, features)
+    recovery, _ = score_recovery(models, features)
+    for record, p, r in zip(missing, priority.tolist(), recovery.tolist()):
+        if record.priority is None:
+            record.priority = p
+        if record.recovery_probability is None:
+            record.recovery_probability = round(r, 2)
+
+
+def _insert_chunk(db: Session, records: List[CaseIngestRecord]) -> List[str]:
+    ids = reserve_case_ids(db, len(records))
+    now = datetime.utcnow()
+    rows = []
+    deltas = rollup.new_deltas()
+    for case_id, record in zip(ids, records):
+        row = {column: getattr(record, column) for column in CASE_COLUMNS}
+        rollup.accumulate(deltas, None, row)
+        row.update(id=case_id, created_at=now, updated_at=now)
+        rows.append(row)
+    db.execute(insert(Case), rows)
+    rollup.apply_deltas(db, deltas)
+    db.commit()
+    return ids
+
+
+def ingest(db: Session, stream: IO[bytes], fmt: str = "csv", score: bool = False,
+           chunk_rows: int = INGEST_CHUNK_ROWS) -> dict:
+    """Ingest every record in stream; returns a report with per-row errors"""
+    report = IngestReport()
+    dca_names = set(db.execute(select(DCA.name)).scalars())
+
+    for chunk in _chunks(iter_records(stream, fmt), chunk_rows):
+        valid = _validate(chunk, report, dca_names, score)
+        if not valid:
+            continue
+        records = [record for _, record in valid]
+        if score:
+            _fill_scores(records)
+        try:
+            ids = _insert_chunk(db, records)
+        except SQLAlchemyError as e:
+            db.rollback()
+            for row_number, _ in valid:
+                report.error(row_number, f"database error: {e.__class__.__name__}")
+            continue
+        report.inserted += len(ids)
+        report.first_id = report.first_id or ids[0]
+        report.last_id = ids[-1]
+
+    return report.as_dict()
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Bulk-load cases from a CSV or NDJSON file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    parser.add_argument("--score", action="store_true", help="fill missing priority/recovery with the models")
+    parser.add_argument("--chunk-rows", type=int, default=INGEST_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    init_db()
+    registry.load()
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as f:
+            result = ingest(db, f, args.format or detect_format(args.path, None), args.score, args.chunk_rows)
+    finally:
+        db.close()
+    errors = result.pop("errors")
+    print(json.dumps(result, indent=2))
+    for error in errors[:20]:
+        print(f"row {error['row']}: {error['error']}", file=sys.stderr)
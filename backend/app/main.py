@@ -1,7 +1,15 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import init_db
-from .routes import cases, analytics, predictions, auth
+from .database import init_db, SessionLocal, engine, async_engine
+from .engine import pool_status
+from .search import install_search_index
+from .case_ids import ensure_case_id_sequence
+from .data_version import ensure_data_version
+from .http_cache import CompressionMiddleware
+from .model_registry import registry
+from . import rollup, sla
+from .routes import cases, analytics, predictions, auth, queue, events
 
 app = FastAPI(
     title="FedEx DCA Management API",
@@ -16,18 +24,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+app.add_middleware(CompressionMiddleware)
 
 # Initialize database
 @app.on_event("startup")
 def startup_event():
     init_db()
+    install_search_index(engine)
+    db = SessionLocal()
+    try:
+        rollup.ensure_built(db)
+        ensure_case_id_sequence(db)
+        ensure_data_version(db)
+        db.commit()
+    finally:
+        db.close()
+    registry.load()
+
+@app.on_event("startup")
+async def start_background_jobs():
+    app.state.sla_sweeper = asyncio.create_task(sla.run_sweeper())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.sla_sweeper.cancel()
+    await async_engine.dispose()
 
 # Include routers
 app.include_router(cases.router)
 app.include_router(analytics.router)
 app.include_router(predictions.router)
 app.include_router(auth.router)
+app.include_router(queue.router)
+app.include_router(events.router)
 
 @app.get("/")
 def root():
@@ -40,3 +71,11 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/health/db")
+def database_health():
+    """Connection pool occupancy and checkout/wait/overflow counters"""
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine.sync_engine),
+    }
@@ -0,0 +1,130 @@
+"""Versioned model bundles, shared by every worker through the page cache.
+
+A bundle is what ml/export_trees.py publishes for each model:
+
+    <name>_bundle.json                  manifest, replaced atomically
+    bundles/<name>/<version>/*.npy      node arrays and scaler parameters
+
+The arrays are the StandardScaler and the tree ensemble compiled into one
+pipeline (see tree_eval.py). The manifest carries the format version, the
+feature order, the ensemble's scalar fields and the training metadata.
+
+Opening a bundle only reads the manifest. The arrays are memory-mapped
+read-only on first use, so nothing is loaded at startup and however many
+uvicorn workers serve the API, the OS keeps one physical copy of them.
+
+A version directory is written once and never modified. A new export goes
+into a new directory before the manifest is swapped, so workers still
+mapping the previous version are unaffected.
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from .tree_eval import CompiledEnsemble
+
+FORMAT_VERSION = 1
+BUNDLE_DIR = "bundles"
+ARRAY_FIELDS = ("feature", "threshold", "left", "right", "value", "roots", "scaler_mean", "scaler_scale")
+
+
+def manifest_filename(name: str) -> str:
+    return f"{name}_bundle.json"
+
+
+class ModelBundle:
+    def __init__(self, manifest: dict, array_dir: str):
+        self.manifest = manifest
+        self.name = manifest["name"]
+        self.version = manifest["version"]
+        self.features = manifest["features"]
+        self.source_sha1 = manifest["source_sha1"]
+        self.array_dir = array_dir
+        self._ensemble = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, manifest_path: str) -> "ModelBundle":
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported bundle format {manifest.get('format')!r}")
+        array_dir = os.path.join(os.path.dirname(manifest_path), manifest["path"])
+        if not os.path.isdir(array_dir):
+            raise FileNotFoundError(array_dir)
+        return cls(manifest, array_dir)
+
+    @property
+    def mapped(self) -> bool:
+        return self._ensemble is not None
+
+    @property
+    def ensemble(self) -> CompiledEnsemble:
+        """The compiled scaler + estimator, mapped on first use"""
+        if self._ensemble is None:
+            with self._lock:
+                if self._ensemble is None:
+                    self._ensemble = self._map()
+        return self._ensemble
+
+    def _map(self) -> CompiledEnsemble:
+        manifest = self.manifest
+        arrays = {
+            name: np.load(os.path.join(self.array_dir, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+            for name in ARRAY_FIELDS
+        }
+        arrays.update(
+            kind=manifest["kind"],
+            depth=manifest["depth"],
+            baseline=manifest["baseline"],
+            n_features=len(manifest["features"]),
+            classes=np.array(manifest["classes"], dtype=str),
+            source_sha1=manifest["source_sha1"],
+        )
+        return CompiledEnsemble(arrays)
+
+
+def write_bundle(model_dir: str, name: str, arrays: dict, features, training: Optional[dict] = None) -> str:
+    """Write flattened ensemble arrays as a bundle and publish its manifest.
+
+    The version is derived from the source pickle, so re-exporting the same
+    model reuses its directory instead of rewriting files workers may have
+    mapped. Returns the manifest path.
+    """
+    source_sha1 = str(arrays["source_sha1"])
+    version = source_sha1[:12]
+    relative_dir = os.path.join(BUNDLE_DIR, name, version)
+    array_dir = os.path.join(model_dir, relative_dir)
+
+    if not os.path.isdir(array_dir):
+        tmp_dir = f"{array_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for field in ARRAY_FIELDS:
+            np.save(os.path.join(tmp_dir, f"{field}.npy"), np.ascontiguousarray(arrays[field]))
+        os.rename(tmp_dir, array_dir)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "name": name,
+        "version": version,
+        "path": relative_dir.replace(os.sep, "/"),
+        "created_at": datetime.utcnow().isoformat(),
+        "features": list(features),
+        "kind": str(arrays["kind"]),
+        "depth": int(arrays["depth"]),
+        "baseline": float(arrays["baseline"]),
+        "classes": [str(c) for c in arrays["classes"]],
+        "source_sha1": source_sha1,
+        "training": training,
+    }
+    manifest_path = os.path.join(model_dir, manifest_filename(name))
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest_path
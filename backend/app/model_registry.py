@@ -0,0 +1,177 @@
+"""Process-wide registry for the trained ML models.
+
+Each model is loaded from its bundle (see model_bundle.py) when
+ml/export_trees.py has published one for the current pickle: only the
+manifest is read here and the arrays are memory-mapped on first use, shared
+by every worker. The sklearn model and scaler are unpickled too when present,
+for the large batches scoring.py sends to sklearn.
+
+Every few seconds the registry checks the files on disk and, when they
+changed, loads a new snapshot and swaps it in. Requests that already hold
+the previous snapshot simply finish with it, so a reload never drops or
+blocks in-flight predictions.
+"""
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import joblib
+
+from .model_bundle import ModelBundle, manifest_filename
+
+MODEL_DIR = os.getenv(
+    "MODEL_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "ml", "models")
+)
+RELOAD_CHECK_SECONDS = float(os.getenv("MODEL_RELOAD_CHECK_SECONDS", "5"))
+
+MODEL_FILES = {
+    "priority_model": "priority_model.pkl",
+    "priority_scaler": "priority_scaler.pkl",
+    "recovery_model": "recovery_model.pkl",
+    "recovery_scaler": "recovery_scaler.pkl",
+    # Written by ml/export_trees.py; used for small batches
+    "priority_bundle": manifest_filename("priority"),
+    "recovery_bundle": manifest_filename("recovery"),
+}
+MODEL_KINDS = ("priority", "recovery")
+
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    """An immutable set of loaded models; swapped as a whole on reload"""
+    version: Optional[str] = None
+    loaded_at: Optional[datetime] = None
+    priority_model: Any = None
+    priority_scaler: Any = None
+    recovery_model: Any = None
+    recovery_scaler: Any = None
+    priority_bundle: Optional[ModelBundle] = None
+    recovery_bundle: Optional[ModelBundle] = None
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str = MODEL_DIR, check_interval: float = RELOAD_CHECK_SECONDS):
+        self.model_dir = os.path.abspath(model_dir)
+        self.check_interval = check_interval
+        self._snapshot = ModelSnapshot()
+        self._signature = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+
+    def load(self) -> ModelSnapshot:
+        """Load (or re-load) the models, waiting for any reload in progress"""
+        with self._reload_lock:
+            self._reload(force=True)
+        return self._snapshot
+
+    def get(self) -> ModelSnapshot:
+        """Return the current snapshot, reloading first if the files changed"""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.reload_if_changed()
+        return self._snapshot
+
+    def reload_if_changed(self) -> bool:
+        # Only one thread reloads; everyone else keeps serving the current snapshot
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            return self._reload(force=False)
+        finally:
+            self._reload_lock.release()
+
+    def status(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at.isoformat() if snapshot.loaded_at else None,
+            "model_dir": self.model_dir,
+            "models": {name: getattr(snapshot, name) is not None for name in MODEL_FILES},
+            "bundles": {
+                kind: {"version": bundle.version, "mapped": bundle.mapped}
+                for kind in MODEL_KINDS
+                if (bundle := getattr(snapshot, f"{kind}_bundle")) is not None
+            },
+            "errors": snapshot.errors,
+        }
+
+    def _file_signature(self):
+        signature = []
+        for name, filename in sorted(MODEL_FILES.items()):
+            try:
+                stat = os.stat(os.path.join(self.model_dir, filename))
+                signature.append((name, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((name, None, None))
+        return tuple(signature)
+
+    def _reload(self, force: bool) -> bool:
+        signature = self._file_signature()
+        if not force and signature == self._signature:
+            return False
+
+        previous = self._snapshot
+        present = {name for name, stat_mtime, _ in signature if stat_mtime is not None}
+        loaded, errors = {name: None for name in MODEL_FILES}, {}
+
+        def load(name, loader):
+            try:
+                loaded[name] = loader(os.path.join(self.model_dir, MODEL_FILES[name]))
+            except Exception as e:
+                # Most likely a file that is still being written; keep what we had
+                loaded[name] = getattr(previous, name)
+                errors[name] = str(e)
+
+        for kind in MODEL_KINDS:
+            if f"{kind}_bundle" in present:
+                load(f"{kind}_bundle", ModelBundle.open)
+        stale = self._drop_stale_bundles(loaded)
+        for kind in MODEL_KINDS:
+            for name in (f"{kind}_model", f"{kind}_scaler"):
+                if name in present:
+                    load(name, joblib.load)
+
+        version = hashlib.sha1(repr(signature).encode()).hexdigest()[:12]
+        self._snapshot = ModelSnapshot(
+            version=version if any(v is not None for v in loaded.values()) else None,
+            loaded_at=datetime.utcnow(),
+            errors={**errors, **stale},
+            **loaded,
+        )
+        # Leave the signature stale on errors so the next check retries the load
+        self._signature = None if errors else signature
+        return True
+
+    def _drop_stale_bundles(self, loaded: dict) -> dict:
+        """Discard bundles exported from a different pickle than the one on disk.
+
+        With no pickle at all the bundle stands alone, so a deployment can
+        ship bundles only.
+        """
+        stale = {}
+        for kind in MODEL_KINDS:
+            bundle = loaded.get(f"{kind}_bundle")
+            if bundle is None:
+                continue
+            model_path = os.path.join(self.model_dir, MODEL_FILES[f"{kind}_model"])
+            if os.path.exists(model_path) and file_sha1(model_path) != bundle.source_sha1:
+                loaded[f"{kind}_bundle"] = None
+                stale[f"{kind}_bundle"] = "stale: re-run ml/export_trees.py"
+        return stale
+
+
+def file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+registry = ModelRegistry()
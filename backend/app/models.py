@@ -14,6 +14,19 @@ class CaseBase(BaseModel):
 class CaseCreate(CaseBase):
     pass
 
+class CaseIngestRecord(BaseModel):
+    """One row of a bulk placement file"""
+    customer_name: str
+    amount: float
+    overdue_days: int
+    status: str = "open"
+    priority: Optional[str] = None
+    dca_assigned: Optional[str] = None
+    recovery_probability: Optional[float] = None
+    # Model inputs only; not stored on the case
+    customer_segment: Optional[str] = "standard"
+    previous_defaults: Optional[int] = 0
+
 class CaseUpdate(BaseModel):
     status: Optional[str] = None
     dca_assigned: Optional[str] = None
@@ -27,6 +40,12 @@ class CaseResponse(CaseBase):
     class Config:
         from_attributes = True
 
+class CaseLeaseResponse(BaseModel):
+    lease_id: str
+    expires_at: datetime
+    score: float
+    case: CaseResponse
+
 class DCABase(BaseModel):
     name: str
     performance_score: float
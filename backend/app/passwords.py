@@ -0,0 +1,85 @@
+"""bcrypt hashing on a dedicated, bounded thread pool
+
+bcrypt is deliberately slow (~250ms at cost 12). Running it in the request
+threadpool lets a burst of logins starve every other sync route, so hashes
+are computed on their own small pool instead. bcrypt releases the GIL, so
+the pool's threads hash in parallel.
+
+    BCRYPT_ROUNDS            cost factor for new hashes (12); hashes at any
+                             other cost are rehashed on the next login
+    PASSWORD_HASH_WORKERS    threads hashing at once (min(4, CPUs))
+    PASSWORD_HASH_QUEUE      hashes allowed to wait for a thread before new
+                             ones are refused with PasswordHashingBusy (256)
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "256"))
+
+# min/max rounds make needs_update() flag hashes at any other cost
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+_lock = threading.Lock()
+_counters = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0, "in_flight": 0}
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+
+def _count(name: str, delta: int = 1) -> None:
+    with _lock:
+        _counters[name] += delta
+
+
+async def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        _count("rejected")
+        raise PasswordHashingBusy()
+    _count("in_flight")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _count("in_flight", -1)
+        _slots.release()
+
+
+async def hash_password(password: str) -> str:
+    hashed = await _run(pwd_context.hash, password)
+    _count("hashed")
+    return hashed
+
+
+async def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Check a password; on success also return a new hash if the cost changed"""
+    valid, new_hash = await _run(pwd_context.verify_and_update, password, hashed)
+    _count("verified")
+    if new_hash is not None:
+        _count("rehashed")
+    return valid, new_hash
+
+
+def status() -> dict:
+    with _lock:
+        counters = dict(_counters)
+    return {
+        "rounds": BCRYPT_ROUNDS,
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue": PASSWORD_HASH_QUEUE,
+        **counters,
+    }
@@ -0,0 +1,237 @@
+"""Re-score every open case's priority and recovery probability.
+
+Scores are set when a case is created or loaded and go stale as cases age
+and models are retrained. This job walks the open and in-progress cases in
+case-id order, RESCORE_CHUNK_ROWS (5000) at a time, and:
+
+- scores each chunk with one vectorized call per model, in a process pool
+  so several chunks are scored while the next is read and the last written
+- writes the changed scores back with one executemany UPDATE per chunk,
+  guarded on updated_at, overdue_days and overdue_as_of so a case edited or
+  aged by the SLA sweeper meanwhile is re-read, not overwritten (ageing
+  leaves updated_at alone, and the rollup deltas depend on overdue_days)
+- applies the chunk's rollup deltas and advances the checkpoint in
+  `job_state` in the same transaction
+
+An interrupted run therefore resumes after its last committed chunk; pass
+--restart to start over. Re-scoring is not an edit, so updated_at is kept.
+Running API workers see the new scores through the data version (ETags) and
+the work queue's periodic resync.
+
+    python -m app.rescore [--restart] [--chunk-rows 5000] [--workers N]
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import and_, bindparam, select, update
+from sqlalchemy.orm import Session
+
+from . import rollup
+from .allocation import ACTIVE_STATUSES
+from .database import Case, JobState
+from .model_registry import registry
+from .scoring import score_priority, score_recovery
+
+RESCORE_CHUNK_ROWS = int(os.getenv("RESCORE_CHUNK_ROWS", "5000"))
+JOB_NAME = "rescore"
+# A chunk whose cases keep changing under it is skipped after this many tries
+MAX_CHUNK_ATTEMPTS = 3
+
+READ_COLUMNS = (Case.id, Case.updated_at, Case.overdue_as_of) + tuple(getattr(Case, field) for field in rollup.CASE_FIELDS)
+
+
+def _init_worker():
+    registry.load()
+
+
+def score_chunk(features: np.ndarray):
+    """Priority labels and rounded recovery probabilities for a feature matrix"""
+    models = registry.get()
+    priority, _ = score_priority(models, features)
+    recovery, _ = score_recovery(models, features)
+    return np.asarray(priority, dtype=str), np.round(recovery, 2)
+
+
+def _features(rows) -> np.ndarray:
+    # Segment and previous defaults aren't stored on cases; score them as the
+    # training pipeline does, as a standard customer with no defaults
+    features = np.zeros((len(rows), 4))
+    features[:, 0] = [row.amount or 0.0 for row in rows]
+    features[:, 1] = [row.overdue_days or 0 for row in rows]
+    return features
+
+
+def _read_chunk(db: Session, after: Optional[str], chunk_rows: int, until: Optional[str] = None):
+    query = select(*READ_COLUMNS).where(Case.status.in_(ACTIVE_STATUSES))
+    if after is not None:
+        query = query.where(Case.id > after)
+    if until is not None:
+        query = query.where(Case.id <= until)
+    rows = db.execute(query.order_by(Case.id).limit(chunk_rows)).all()
+    db.commit()  # end the read transaction; don't hold a snapshot while scoring
+    return rows
+
+
+def _state(db: Session) -> JobState:
+    state = db.get(JobState, JOB_NAME)
+    if state is None:
+        state = JobState(name=JOB_NAME)
+        db.add(state)
+        db.flush()
+    return state
+
+
+class _Conflict(Exception):
+    pass
+
+
+def _advance(db: Session, end: str, n_rows: int) -> None:
+    """Move the checkpoint past a chunk and commit"""
+    state = _state(db)
+    state.cursor = end
+    state.processed = (state.processed or 0) + n_rows
+    db.commit()
+
+
+def _write_chunk(db: Session, end: str, rows, priority, recovery) -> int:
+    """Write changed scores, rollup deltas and the checkpoint; returns rows changed"""
+    params, deltas = [], rollup.new_deltas()
+    for row, new_priority, new_recovery in zip(rows, priority.tolist(), recovery.tolist()):
+        if row.priority == new_priority and row.recovery_probability == new_recovery:
+            continue
+        old = {field: getattr(row, field) for field in rollup.CASE_FIELDS}
+        rollup.accumulate(deltas, old, {**old, "priority": new_priority, "recovery_probability": new_recovery})
+        params.append({
+            "case_id": row.id, "seen": row.updated_at,
+            "seen_overdue_days": row.overdue_days, "seen_overdue_as_of": row.overdue_as_of,
+            "new_priority": new_priority, "new_recovery": new_recovery,
+        })
+
+    if params:
+        table = Case.__table__
+        result = db.execute(
+            update(table)
+            .where(and_(
+                table.c.id == bindparam("case_id"),
+                table.c.updated_at.is_not_distinct_from(bindparam("seen")),
+                table.c.overdue_days.is_not_distinct_from(bindparam("seen_overdue_days")),
+                table.c.overdue_as_of.is_not_distinct_from(bindparam("seen_overdue_as_of")),
+            ))
+            .values(
+                priority=bindparam("new_priority"),
+                recovery_probability=bindparam("new_recovery"),
+                updated_at=table.c.updated_at,
+            ),
+            params,
+        )
+        if db.get_bind().dialect.supports_sane_multi_rowcount and result.rowcount != len(params):
+            db.rollback()
+            raise _Conflict()
+        rollup.apply_deltas(db, deltas)
+    _advance(db, end, len(rows))
+    return len(params)
+
+
+def rescore(db: Session, restart: bool = False, chunk_rows: int = RESCORE_CHUNK_ROWS,
+            workers: Optional[int] = None, progress=None) -> dict:
+    """Re-score every open case, resuming an interrupted run unless restart"""
+    started = time.perf_counter()
+    state = _state(db)
+    resumed_from = None if restart else state.cursor
+    if resumed_from is None:
+        state.cursor, state.processed = None, 0
+    db.commit()
+    already_done = state.processed or 0
+
+    registry.load()
+    workers = os.cpu_count() if workers is None else workers
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker) if workers > 0 else None
+
+    def submit(rows):
+        features = _features(rows)
+        return pool.submit(score_chunk, features) if pool else score_chunk(features)
+
+    def result(scored):
+        return scored.result() if pool else scored
+
+    scored_rows = changed = skipped = 0
+    try:
+        # Read ahead so the pool always has a chunk to score while we write
+        pending = deque()
+        after = resumed_from
+        while True:
+            rows = _read_chunk(db, after, chunk_rows)
+            if rows:
+                pending.append((after, rows[-1].id, rows, submit(rows)))
+                after = rows[-1].id
+            if pending and (not rows or len(pending) > max(workers, 1)):
+                start, end, chunk, scored = pending.popleft()
+                n_rows = len(chunk)
+                for _ in range(MAX_CHUNK_ATTEMPTS):
+                    if not chunk:
+                        _advance(db, end, n_rows)
+                        break
+                    try:
+                        changed += _write_chunk(db, end, chunk, *result(scored))
+                        break
+                    except _Conflict:
+                        # Cases changed since they were read; read and score the same range again
+                        chunk = _read_chunk(db, start, chunk_rows, until=end)
+                        scored = submit(chunk)
+                else:
+                    skipped += len(chunk)
+                    _advance(db, end, n_rows)
+                scored_rows += n_rows
+                if progress:
+                    elapsed = time.perf_counter() - started
+                    progress(already_done + scored_rows, changed, scored_rows / elapsed if elapsed else 0.0)
+            if not rows and not pending:
+                break
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    state = _state(db)
+    state.cursor = None
+    state.last_run_at = datetime.utcnow()
+    db.commit()
+
+    seconds = time.perf_counter() - started
+    return {
+        "resumed_from": resumed_from,
+        "cases": already_done + scored_rows,
+        "scored_this_run": scored_rows,
+        "changed": changed,
+        "skipped_busy": skipped,
+        "model_version": registry.get().version,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(scored_rows / seconds, 1) if seconds else None,
+    }
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Re-score every open case with the current models")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of an interrupted run")
+    parser.add_argument("--chunk-rows", type=int, default=RESCORE_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, help="scoring processes (default: CPU count; 0 scores in-process)")
+    args = parser.parse_args()
+
+    def report(done, changed, rate):
+        print(f"{done} cases scored, {changed} changed, {rate:.0f} rows/s", flush=True)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        result = rescore(db, restart=args.restart, chunk_rows=args.chunk_rows, workers=args.workers, progress=report)
+    finally:
+        db.close()
+    print(json.dumps(result, indent=2))
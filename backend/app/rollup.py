@@ -0,0 +1,195 @@
+"""Incrementally maintained analytics rollup.
+
+`analytics_rollup` holds one row per (dimension, key) with the case count,
+amount total and recovery-probability sum for that slice of the book:
+
+    total     ""                      every case
+    bucket    ageing bucket label     see ageing.py
+    status    case status
+    priority  case priority
+    dca       assigned DCA ("" when unassigned)
+    sla       "breached" / "critical" overdue past the SLA thresholds
+
+Case writes call apply_case_change() inside their own transaction, so the
+rollup commits (or rolls back) together with the case. Both apply_deltas()
+and rebuild() also bump the data version used for HTTP ETags. If it ever drifts,
+rebuild() recomputes it from the cases table:
+
+    python -m app.rollup rebuild
+"""
+import sys
+from collections import defaultdict, namedtuple
+from typing import Dict, Optional
+
+from sqlalchemy import String, cast, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from .ageing import AGEING_BUCKETS, SLA_BREACH_DAYS, SLA_CRITICAL_DAYS, bucket_expression, bucket_index
+from . import data_version
+from .database import AnalyticsRollup, Case
+
+DIMENSIONS = ("total", "bucket", "status", "priority", "dca", "sla")
+CASE_FIELDS = ("amount", "recovery_probability", "overdue_days", "status", "priority", "dca_assigned")
+
+Totals = namedtuple("Totals", "case_count total_amount recovery_sum recovery_count")
+EMPTY = Totals(0, 0, 0, 0)
+
+
+def snapshot(case) -> dict:
+    """Capture the fields of a case the rollup depends on"""
+    return {field: getattr(case, field) for field in CASE_FIELDS}
+
+
+def case_keys(state: dict):
+    """(dimension, key) pairs a case with this state contributes to"""
+    keys = [("total", ""), ("status", state["status"] or ""), ("priority", state["priority"] or ""),
+            ("dca", state["dca_assigned"] or "")]
+    index = bucket_index(state["overdue_days"])
+    if index is not None:
+        keys.append(("bucket", AGEING_BUCKETS[index]["label"]))
+    overdue_days = state["overdue_days"] or 0
+    if overdue_days > SLA_BREACH_DAYS:
+        keys.append(("sla", "breached"))
+    if overdue_days > SLA_CRITICAL_DAYS:
+        keys.append(("sla", "critical"))
+    return keys
+
+
+def _case_values(state: dict, sign: int):
+    recovery = state["recovery_probability"]
+    return (
+        sign,
+        sign * (state["amount"] or 0),
+        sign * (recovery or 0),
+        sign if recovery is not None else 0,
+    )
+
+
+def new_deltas():
+    return defaultdict(lambda: [0, 0.0, 0.0, 0])
+
+
+def accumulate(deltas, old: Optional[dict], new: Optional[dict]) -> None:
+    """Add one case's change to a deltas dict from new_deltas()"""
+    for state, sign in ((old, -1), (new, 1)):
+        if state is None:
+            continue
+        values = _case_values(state, sign)
+        for key in case_keys(state):
+            delta = deltas[key]
+            for i, value in enumerate(values):
+                delta[i] += value
+
+
+def apply_case_change(db: Session, old: Optional[dict], new: Optional[dict]) -> None:
+    """Move a case's contribution from its old state to its new one.
+
+    Pass old=None for a created case and new=None for a deleted one. The
+    caller commits.
+    """
+    deltas = new_deltas()
+    accumulate(deltas, old, new)
+    apply_deltas(db, deltas)
+
+
+def apply_deltas(db: Session, deltas: Dict[tuple, list]) -> None:
+    """Add (count, amount, recovery_sum, recovery_count) deltas per (dimension, key)"""
+    data_version.bump(db)
+    for (dimension, key), (count, amount, recovery_sum, recovery_count) in deltas.items():
+        if not (count or amount or recovery_sum or recovery_count):
+            continue
+        result = db.execute(
+            update(AnalyticsRollup)
+            .where(AnalyticsRollup.dimension == dimension, AnalyticsRollup.key == key)
+            .values(
+                case_count=AnalyticsRollup.case_count + count,
+                total_amount=AnalyticsRollup.total_amount + amount,
+                recovery_sum=AnalyticsRollup.recovery_sum + recovery_sum,
+                recovery_count=AnalyticsRollup.recovery_count + recovery_count,
+            )
+        )
+        if result.rowcount == 0:
+            db.execute(insert(AnalyticsRollup).values(
+                dimension=dimension, key=key, case_count=count, total_amount=amount,
+                recovery_sum=recovery_sum, recovery_count=recovery_count,
+            ))
+
+
+def read(db: Session) -> Dict[str, Dict[str, Totals]]:
+    """Load the whole rollup as {dimension: {key: Totals}}"""
+    result = {dimension: {} for dimension in DIMENSIONS}
+    for row in db.execute(select(AnalyticsRollup)).scalars():
+        result.setdefault(row.dimension, {})[row.key] = Totals(
+            row.case_count, row.total_amount, row.recovery_sum, row.recovery_count
+        )
+    return result
+
+
+def _aggregate(db: Session, key_expression, *where):
+    return db.execute(
+        select(
+            key_expression,
+            func.count(Case.id),
+            func.coalesce(func.sum(Case.amount), 0),
+            func.coalesce(func.sum(Case.recovery_probability), 0),
+            func.count(Case.recovery_probability),
+        ).where(*where).group_by(key_expression)
+    ).all()
+
+
+def rebuild(db: Session, dimensions=DIMENSIONS) -> None:
+    """Recompute the given rollup dimensions from the cases table and commit"""
+    rows = []
+    for dimension in dimensions:
+        if dimension == "total":
+            aggregates = _aggregate(db, cast("", String))
+        elif dimension == "bucket":
+            aggregates = [
+                (AGEING_BUCKETS[index]["label"], *values)
+                for index, *values in _aggregate(db, bucket_expression(Case.overdue_days), Case.overdue_days >= 0)
+                if index is not None
+            ]
+        elif dimension == "sla":
+            aggregates = [
+                (key, *values)
+                for key, threshold in (("breached", SLA_BREACH_DAYS), ("critical", SLA_CRITICAL_DAYS))
+                for _, *values in _aggregate(db, cast("", String), Case.overdue_days > threshold)
+            ]
+        else:
+            column = {"status": Case.status, "priority": Case.priority, "dca": Case.dca_assigned}[dimension]
+            aggregates = _aggregate(db, func.coalesce(column, ""))
+
+        rows.extend(
+            {"dimension": dimension, "key": key, "case_count": count, "total_amount": amount,
+             "recovery_sum": recovery_sum, "recovery_count": recovery_count}
+            for key, count, amount, recovery_sum, recovery_count in aggregates
+        )
+
+    db.query(AnalyticsRollup).filter(AnalyticsRollup.dimension.in_(dimensions)).delete(synchronize_session=False)
+    data_version.bump(db)
+    if rows:
+        db.execute(insert(AnalyticsRollup), rows)
+    db.commit()
+
+
+def ensure_built(db: Session) -> None:
+    """Rebuild on first start, or after the ageing bucket config changed"""
+    totals = read(db)
+    labels = {b["label"] for b in AGEING_BUCKETS}
+    if "" not in totals["total"] or not set(totals["bucket"]) <= labels:
+        rebuild(db)
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal, init_db
+
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m app.rollup rebuild")
+    init_db()
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        total = read(db)["total"].get("", EMPTY)
+        print(f"Rollup rebuilt from {total.case_count} cases")
+    finally:
+        db.close()
@@ -1,38 +1,37 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from ..database import get_db, Case as DBCase, DCA as DBDCA
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, select
+from ..database import get_async_db, Case as DBCase, DCA as DBDCA, SLA as DBSLA
+from ..ageing import AGEING_BUCKETS, bucket_expression
+from .. import rollup, sla
+from ..http_cache import ANALYTICS_CACHE, STATIC_CACHE, cached
+from ..fast_json import ResponseClass
 from datetime import datetime, timedelta
 
-router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+router = APIRouter(prefix="/api/analytics", tags=["analytics"], default_response_class=ResponseClass)
 
-@router.get("/ageing-buckets")
-def get_ageing_buckets(db: Session = Depends(get_db)):
+@router.get("/ageing-buckets", dependencies=[cached(ANALYTICS_CACHE)])
+async def get_ageing_buckets(db: AsyncSession = Depends(get_async_db)):
     """Get distribution of cases by overdue period"""
-    buckets = [
-        {"label": "0-30 days", "min": 0, "max": 30},
-        {"label": "31-60 days", "min": 31, "max": 60},
-        {"label": "61-90 days", "min": 61, "max": 90},
-        {"label": "90+ days", "min": 91, "max": 999999},
+    bucket = bucket_expression(DBCase.overdue_days).label("bucket")
+    rows = (await db.execute(select(
+        bucket,
+        func.count(DBCase.id),
+        func.coalesce(func.sum(DBCase.amount), 0)
+    ).filter(DBCase.overdue_days >= 0).group_by(bucket))).all()
+
+    totals = {index: (count, amount) for index, count, amount in rows}
+    return [
+        {
+            "label": b["label"],
+            "count": totals.get(i, (0, 0))[0],
+            "amount": totals.get(i, (0, 0))[1]
+        }
+        for i, b in enumerate(AGEING_BUCKETS)
     ]
-    
-    result = []
-    for bucket in buckets:
-        cases = db.query(DBCase).filter(
-            DBCase.overdue_days >= bucket["min"],
-            DBCase.overdue_days <= bucket["max"]
-        ).all()
-        
-        result.append({
-            "label": bucket["label"],
-            "count": len(cases),
-            "amount": sum(c.amount for c in cases)
-        })
-    
-    return result
 
-@router.get("/recovery-rate")
-def get_recovery_rate(db: Session = Depends(get_db)):
+@router.get("/recovery-rate", dependencies=[cached(STATIC_CACHE)])
+async def get_recovery_rate(db: AsyncSession = Depends(get_async_db)):
     """Get recovery rate trends"""
     # Mock data for demo - in production, calculate from actual data
     return [
@@ -41,10 +40,10 @@ def get_recovery_rate(db: Session = Depends(get_db)):
         {"month": "Mar", "rate": 72},
     ]
 
-@router.get("/dca-performance")
-def get_dca_performance(db: Session = Depends(get_db)):
+@router.get("/dca-performance", dependencies=[cached(ANALYTICS_CACHE)])
+async def get_dca_performance(db: AsyncSession = Depends(get_async_db)):
     """Get DCA performance comparison"""
-    dcas = db.query(DBDCA).all()
+    dcas = (await db.execute(select(DBDCA))).scalars().all()
     
     result = []
     for dca in dcas:
@@ -57,42 +56,65 @@ def get_dca_performance(db: Session = Depends(get_db)):
     
     return result
 
-@router.get("/sla-breaches")
-def get_sla_breaches(db: Session = Depends(get_db)):
-    """Get SLA breach summary"""
-    total_cases = db.query(DBCase).count()
-    
-    # Cases overdue > 90 days are considered SLA breaches
-    breached_cases = db.query(DBCase).filter(DBCase.overdue_days > 90).count()
-    critical_breaches = db.query(DBCase).filter(DBCase.overdue_days > 120).count()
-    
+@router.get("/sla-breaches", dependencies=[cached(ANALYTICS_CACHE)])
+async def get_sla_breaches(db: AsyncSession = Depends(get_async_db)):
+    """Get SLA breach summary from the flags kept by the SLA sweeper"""
+    total_cases, breached_cases, critical_breaches = (await db.execute(select(
+        func.count(DBSLA.id),
+        func.coalesce(func.sum(case((DBSLA.is_breached.is_(True), 1), else_=0)), 0),
+        func.coalesce(func.sum(case((DBSLA.is_critical.is_(True), 1), else_=0)), 0),
+    ))).one()
+
     return {
         "total": breached_cases,
         "critical": critical_breaches,
         "percentage": round((breached_cases / total_cases * 100) if total_cases > 0 else 0, 1)
     }
 
-@router.get("/summary")
-def get_analytics_summary(db: Session = Depends(get_db)):
-    """Get comprehensive analytics summary"""
-    total_cases = db.query(DBCase).count()
-    total_amount = db.query(func.sum(DBCase.amount)).scalar() or 0
-    avg_recovery = db.query(func.avg(DBCase.recovery_probability)).scalar() or 0
-    
+@router.get("/sla-sweeper")
+def get_sla_sweeper_status():
+    """Report this worker's last SLA sweep; null until it has run one"""
+    return {"interval_seconds": sla.SLA_SWEEP_INTERVAL_SECONDS, "last_run": sla.last_result}
+
+@router.get("/summary", dependencies=[cached(ANALYTICS_CACHE)])
+async def get_analytics_summary(db: AsyncSession = Depends(get_async_db)):
+    """Get comprehensive analytics summary.
+
+    Case totals come from the analytics rollup, so this reads a few dozen
+    pre-aggregated rows instead of scanning the cases table. SLA breaches
+    come from the SLA flags, as in /sla-breaches.
+    """
+    totals = await db.run_sync(rollup.read)
+    total = totals["total"].get("", rollup.EMPTY)
+    total_cases = total.case_count
+    total_amount = total.total_amount
+    avg_recovery = total.recovery_sum / total.recovery_count if total.recovery_count else 0
+
     # Calculate average resolution days (mock for demo)
     avg_resolution_days = 45
-    
-    ageing_buckets = get_ageing_buckets(db)
-    dca_performance = get_dca_performance(db)
-    sla_breaches = get_sla_breaches(db)
-    recovery_rate = get_recovery_rate(db)
-    
+
+    ageing_buckets = [
+        {
+            "label": b["label"],
+            "count": totals["bucket"].get(b["label"], rollup.EMPTY).case_count,
+            "amount": totals["bucket"].get(b["label"], rollup.EMPTY).total_amount
+        }
+        for b in AGEING_BUCKETS
+    ]
+    # Breaches are the SLA sweeper's flags, as in /sla-breaches
+    sla_breaches = await get_sla_breaches(db)
+    dca_performance = await get_dca_performance(db)
+    recovery_rate = await get_recovery_rate(db)
+
     return {
         "kpis": {
             "totalCases": total_cases,
             "totalAmount": total_amount,
             "avgRecoveryRate": round(avg_recovery * 100, 0),
-            "avgResolutionDays": avg_resolution_days
+            "avgResolutionDays": avg_resolution_days,
+            # Lets clients apply live kpi_delta events to the average
+            "recoverySum": total.recovery_sum,
+            "recoveryCount": total.recovery_count
         },
         "ageingBuckets": ageing_buckets,
         "recoveryRate": recovery_rate,
@@ -1,12 +1,16 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import os
+import time
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from ..database import get_db, User
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db, User
 from ..models import UserCreate, UserResponse, Token, TokenData, UserUpdate
+from ..cache import TTLCache
+from .. import passwords
 
 # Configuration
 SECRET_KEY = "fedex_super_secret_hackathon_key"  # In production, use env var
@@ -15,14 +19,37 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 router = APIRouter(tags=["authentication"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Validated tokens and the users they resolved to, so authenticating a
+# repeat request is a dict lookup instead of a JWT decode and a query.
+# Entries never outlive the token's exp claim. The cache is per process, so
+# after a profile change other workers may serve the old record for up to
+# the TTL.
+token_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60")),
+)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def _hashing_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+async def hash_password(password: str) -> str:
+    try:
+        return await passwords.hash_password(password)
+    except passwords.PasswordHashingBusy:
+        raise _hashing_busy()
+
+async def check_password(plain_password: str, hashed_password: str):
+    """Verify on the hashing pool; returns (valid, upgraded hash or None)"""
+    try:
+        return await passwords.verify_and_update(plain_password, hashed_password)
+    except passwords.PasswordHashingBusy:
+        raise _hashing_busy()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -34,7 +61,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return await db.scalar(select(User).filter(User.email == email))
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    user = token_cache.get(token)
+    if user is not None:
+        return user
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -48,18 +81,24 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == token_data.email).first()
+    user = await get_user_by_email(db, token_data.email)
     if user is None:
         raise credentials_exception
+    ttl = min(token_cache.ttl, payload["exp"] - time.time()) if "exp" in payload else token_cache.ttl
+    # expire_on_commit is off, so the user stays readable once detached
+    token_cache.set(token, user, ttl=ttl)
     return user
 
+def invalidate_user(user_id: int) -> None:
+    token_cache.discard_if(lambda token, user: user.id == user_id)
+
 @router.post("/api/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await get_user_by_email(db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     new_user = User(
         email=user.email,
         full_name=user.full_name,
@@ -67,20 +106,25 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         role=user.role
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 @router.post("/api/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     # OAuth2PasswordRequestForm expects 'username' field, which we map to email
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await get_user_by_email(db, form_data.username)
+    valid, new_hash = await check_password(form_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Stored at an old bcrypt cost; upgrade it now we have the password
+        user.hashed_password = new_hash
+        await db.commit()
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email}, expires_delta=access_token_expires
@@ -88,20 +132,33 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/api/users/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.put("/api/users/me", response_model=UserResponse)
-def update_user_me(user_update: UserUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    if user_update.full_name is not None:
-        current_user.full_name = user_update.full_name
-    if user_update.email is not None:
-        # Check if email is already taken if changing
-        if user_update.email != current_user.email:
-            db_user = db.query(User).filter(User.email == user_update.email).first()
-            if db_user:
-                raise HTTPException(status_code=400, detail="Email already registered")
-            current_user.email = user_update.email
-    db.commit()
-    db.refresh(current_user)
+async def update_user_me(user_update: UserUpdate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    # A cached user is detached and shared with other requests; edit this
+    # session's copy instead
+    current_user = await db.get(User, current_user.id)
+    try:
+        if user_update.full_name is not None:
+            current_user.full_name = user_update.full_name
+        if user_update.email is not None:
+            # Check if email is already taken if changing
+            if user_update.email != current_user.email:
+                db_user = await get_user_by_email(db, user_update.email)
+                if db_user:
+                    raise HTTPException(status_code=400, detail="Email already registered")
+                current_user.email = user_update.email
+        await db.commit()
+        await db.refresh(current_user)
+    finally:
+        # Tokens issued for the old email must stop resolving, and cached
+        # copies must not show a half-applied or rolled back edit
+        invalidate_user(current_user.id)
     return current_user
+
+@router.get("/api/auth/status")
+def get_auth_status():
+    """Report token cache size and hit rate, and password hashing load"""
+    return {"token_cache": token_cache.stats(), "password_hashing": passwords.status()}
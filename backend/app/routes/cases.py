@@ -1,79 +1,339 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Path, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db, Case as DBCase
+from typing import List, Optional
+from ..database import get_async_db, get_db, SessionLocal, Case as DBCase
 from ..models import CaseResponse, CaseCreate, CaseUpdate
-import random
-import string
+from .. import rollup
+from ..search import search_cases
+from ..case_ids import reserve_case_ids
+from ..ingest import detect_format, ingest
+from ..allocation import AllocationConflict, allocate
+from ..work_queue import work_queue
+from ..events import broker, publish_case_change
+from ..http_cache import CASES_CACHE, cached
+from .. import fast_json
+from datetime import datetime
+import base64
+import csv
+import io
+import json
+import zlib
 
 router = APIRouter(prefix="/api/cases", tags=["cases"])
 
-def generate_case_id():
-    return f"CASE-{random.randint(1000, 9999)}"
+SORT_COLUMNS = {
+    "created_at": DBCase.created_at,
+    "overdue_days": DBCase.overdue_days,
+    "amount": DBCase.amount,
+}
 
-@router.get("/", response_model=List[CaseResponse])
-def get_cases(
+EXPORT_COLUMNS = (
+    "id", "customer_name", "amount", "overdue_days", "status", "priority",
+    "dca_assigned", "recovery_probability", "created_at", "updated_at",
+)
+EXPORT_BATCH_ROWS = 2000
+
+# Fields of CaseResponse in its output order, for the FAST_JSON path
+CASE_FIELDS = tuple(CaseResponse.model_fields)
+CASE_COLUMNS = [getattr(DBCase, field) for field in CASE_FIELDS]
+
+def generate_case_id(db: Session):
+    return reserve_case_ids(db, 1)[0]
+
+class CaseFilters:
+    """Server-side case filters shared by the list and export endpoints"""
+
+    def __init__(
+        self,
+        priority: Optional[str] = None,
+        status: Optional[str] = None,
+        dca: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        min_overdue_days: Optional[int] = None,
+        max_overdue_days: Optional[int] = None,
+    ):
+        self.priority = priority
+        self.status = status
+        self.dca = dca
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.min_overdue_days = min_overdue_days
+        self.max_overdue_days = max_overdue_days
+
+    def apply(self, query):
+        if self.priority:
+            query = query.filter(DBCase.priority == self.priority)
+        if self.status:
+            query = query.filter(DBCase.status == self.status)
+        if self.dca:
+            query = query.filter(DBCase.dca_assigned == self.dca)
+        if self.min_amount is not None:
+            query = query.filter(DBCase.amount >= self.min_amount)
+        if self.max_amount is not None:
+            query = query.filter(DBCase.amount <= self.max_amount)
+        if self.min_overdue_days is not None:
+            query = query.filter(DBCase.overdue_days >= self.min_overdue_days)
+        if self.max_overdue_days is not None:
+            query = query.filter(DBCase.overdue_days <= self.max_overdue_days)
+        return query
+
+def encode_cursor(sort: str, order: str, case) -> str:
+    value = getattr(case, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    token = json.dumps([sort, order, value, case.id]).encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, order: str):
+    try:
+        token = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, value, case_id = json.loads(token)
+        if (cursor_sort, cursor_order) == (sort, order):
+            if sort == "created_at":
+                value = datetime.fromisoformat(value)
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise TypeError(value)
+            if not isinstance(case_id, str):
+                raise TypeError(case_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different sort order")
+    return value, case_id
+
+def order_cases(query, sort: str, order: str):
+    if order == "desc":
+        return query.order_by(SORT_COLUMNS[sort].desc(), DBCase.id.desc())
+    return query.order_by(SORT_COLUMNS[sort].asc(), DBCase.id.asc())
+
+@router.get("/", response_model=List[CaseResponse], dependencies=[cached(CASES_CACHE)])
+async def get_cases(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    priority: str = None,
-    status: str = None,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = Query("created_at", pattern="^(created_at|overdue_days|amount)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    filters: CaseFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all cases with optional filters"""
-    query = db.query(DBCase)
-    
-    if priority:
-        query = query.filter(DBCase.priority == priority)
-    if status:
-        query = query.filter(DBCase.status == status)
-    
-    cases = query.offset(skip).limit(limit).all()
+    """Get cases with optional filters.
+
+    Pages are ordered by `sort` then case id. Pass the X-Next-Cursor header
+    of one page as `cursor` to get the next; unlike `skip` this costs the
+    same on every page.
+    """
+    query = filters.apply(select(*CASE_COLUMNS) if fast_json.FAST_JSON else select(DBCase))
+
+    sort_key = tuple_(SORT_COLUMNS[sort], DBCase.id)
+    query = order_cases(query, sort, order)
+
+    if cursor:
+        after = tuple_(*decode_cursor(cursor, sort, order))
+        query = query.filter(sort_key < after if order == "desc" else sort_key > after)
+    elif skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to learn whether there is a next page
+    result = await db.execute(query.limit(limit + 1))
+    cases = result.all() if fast_json.FAST_JSON else result.scalars().all()
+    if len(cases) > limit:
+        cases = cases[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(sort, order, cases[-1])
+    if fast_json.FAST_JSON:
+        return fast_json.rows_response(CASE_FIELDS, cases, response)
+    return cases
+
+@router.get("/search", response_model=List[CaseResponse], dependencies=[cached(CASES_CACHE)])
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Search the whole book by case id or customer name, best matches first.
+
+    Every word is matched as a prefix, so "acme corp" finds "Acme Corporation"
+    and "CASE-10" finds every id starting with it.
+    """
+    cases = await db.run_sync(search_cases, q, limit)
+    if fast_json.FAST_JSON:
+        rows = ([getattr(case, field) for field in CASE_FIELDS] for case in cases)
+        return fast_json.rows_response(CASE_FIELDS, rows, response)
     return cases
 
-@router.get("/{case_id}", response_model=CaseResponse)
-def get_case(case_id: str, db: Session = Depends(get_db)):
+def _export_batches(filters: CaseFilters, sort: str, order: str):
+    # The request's session is closed before a streamed body is sent, so the
+    # export owns its own; yield_per streams rows through a server-side cursor
+    db = SessionLocal()
+    try:
+        columns = [getattr(DBCase, column) for column in EXPORT_COLUMNS]
+        query = order_cases(filters.apply(db.query(*columns)), sort, order)
+        batch = []
+        for row in query.yield_per(EXPORT_BATCH_ROWS):
+            batch.append(row)
+            if len(batch) >= EXPORT_BATCH_ROWS:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        db.close()
+
+def _csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def _ndjson_chunks(batches):
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=datetime.isoformat) + "\n"
+            for row in batch
+        )
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+@router.get("/export/{fmt}")
+def export_cases(
+    request: Request,
+    fmt: str = Path(..., pattern="^(csv|ndjson)$"),
+    sort: str = Query("created_at", pattern="^(created_at|overdue_days|amount)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    gzip: Optional[bool] = None,
+    filters: CaseFilters = Depends()
+):
+    """Stream every matching case as CSV or NDJSON.
+
+    Takes the same filters as the list endpoint. Rows are read and written in
+    small batches, so memory stays flat whatever the result size. The body is
+    gzipped on the fly when the client accepts it (or gzip=true).
+    """
+    batches = _export_batches(filters, sort, order)
+    chunks = _csv_chunks(batches) if fmt == "csv" else _ndjson_chunks(batches)
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="cases.{fmt}"'}
+
+    if gzip is None:
+        gzip = "gzip" in request.headers.get("accept-encoding", "")
+    if gzip:
+        chunks = _gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+@router.post("/bulk")
+def bulk_create_cases(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    score: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Bulk-load cases from a CSV or NDJSON placement file.
+
+    Rows are validated and inserted in chunks; invalid rows are reported by
+    row number and skipped. With score=true, missing priority and recovery
+    probability are filled in by the models.
+    """
+    fmt = format or detect_format(file.filename, file.content_type)
+    try:
+        return ingest(db, file.file, fmt, score=score)
+    finally:
+        work_queue.mark_stale()
+        broker.publish_threadsafe("resync", {"reason": "bulk_ingest"})
+
+@router.post("/allocate")
+def allocate_cases(
+    dry_run: bool = False,
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """Allocate every open, unallocated case to a DCA in one batch.
+
+    Fills each agency up to its `active_cases` capacity, maximizing expected
+    recovery (amount x recovery probability x agency performance score).
+    With dry_run=true nothing is written and the full plan is returned.
+    """
+    try:
+        result = allocate(db, dry_run=dry_run, limit=limit)
+    except AllocationConflict as e:
+        raise HTTPException(status_code=409, detail=f"{e}; retry to plan again")
+    if not dry_run:
+        work_queue.mark_stale()
+        broker.publish_threadsafe("resync", {"reason": "batch_allocation"})
+    return result
+
+@router.get("/{case_id}", response_model=CaseResponse, dependencies=[cached(CASES_CACHE)])
+async def get_case(case_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific case by ID"""
-    case = db.query(DBCase).filter(DBCase.id == case_id).first()
+    case = await db.get(DBCase, case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     return case
 
 @router.post("/", response_model=CaseResponse)
-def create_case(case: CaseCreate, db: Session = Depends(get_db)):
+async def create_case(case: CaseCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new case"""
     db_case = DBCase(
-        id=generate_case_id(),
+        id=await db.run_sync(generate_case_id),
         **case.dict()
     )
     db.add(db_case)
-    db.commit()
-    db.refresh(db_case)
+    await db.run_sync(rollup.apply_case_change, None, rollup.snapshot(db_case))
+    await db.commit()
+    await db.refresh(db_case)
+    work_queue.upsert(db_case)
+    publish_case_change("created", db_case, None)
     return db_case
 
 @router.put("/{case_id}", response_model=CaseResponse)
-def update_case(case_id: str, case_update: CaseUpdate, db: Session = Depends(get_db)):
+async def update_case(case_id: str, case_update: CaseUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update a case"""
-    db_case = db.query(DBCase).filter(DBCase.id == case_id).first()
+    db_case = await db.get(DBCase, case_id)
     if not db_case:
         raise HTTPException(status_code=404, detail="Case not found")
     
+    before = rollup.snapshot(db_case)
     update_data = case_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_case, field, value)
     
-    db.commit()
-    db.refresh(db_case)
+    await db.run_sync(rollup.apply_case_change, before, rollup.snapshot(db_case))
+    await db.commit()
+    await db.refresh(db_case)
+    work_queue.upsert(db_case)
+    publish_case_change("updated", db_case, before)
     return db_case
 
 @router.post("/{case_id}/allocate")
-def allocate_case(case_id: str, dca_name: str, db: Session = Depends(get_db)):
+async def allocate_case(case_id: str, dca_name: str, db: AsyncSession = Depends(get_async_db)):
     """Allocate a case to a DCA"""
-    db_case = db.query(DBCase).filter(DBCase.id == case_id).first()
+    db_case = await db.get(DBCase, case_id)
     if not db_case:
         raise HTTPException(status_code=404, detail="Case not found")
     
+    before = rollup.snapshot(db_case)
     db_case.dca_assigned = dca_name
     db_case.status = "in_progress"
-    db.commit()
+    await db.run_sync(rollup.apply_case_change, before, rollup.snapshot(db_case))
+    await db.commit()
+    work_queue.upsert(db_case)
+    publish_case_change("allocated", db_case, before)
     
     return {"message": f"Case {case_id} allocated to {dca_name}"}
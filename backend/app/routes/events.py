@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from ..events import CLOSE, broker
+import asyncio
+import json
+import os
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+def _format(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+async def _stream(request: Request, subscriber, resume: bool):
+    try:
+        # Tell clients to ask for a retry after 3s, and as there is no replay,
+        # send a reconnecting client straight to a full re-fetch
+        yield "retry: 3000\n\n"
+        if resume:
+            yield _format({"id": 0, "type": "resync", "data": {"reason": "reconnected"}})
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line; keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            if event is CLOSE:
+                break
+            yield _format(event)
+    finally:
+        broker.unsubscribe(subscriber)
+
+@router.get("")
+async def stream_events(request: Request):
+    """Server-sent events: `case` (with KPI deltas) and `resync`.
+
+    Apply each `case` event's kpi_delta to the summary totals and patch the
+    case into any list showing it. On `resync`, re-fetch everything.
+    """
+    subscriber = broker.subscribe()
+    resume = request.headers.get("last-event-id") is not None
+    return StreamingResponse(
+        _stream(request, subscriber, resume),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/status")
+def get_event_status():
+    """Report subscriber count and publish/overflow counters for this worker"""
+    return broker.status()
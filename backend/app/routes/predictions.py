@@ -1,101 +1,171 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from typing import List
 from ..models import PredictionRequest, PredictionResponse
+from ..model_registry import registry
+from ..scoring import build_matrix, score_priority, score_recovery
+from ..cache import TTLCache
+import json
 import os
-import joblib
 import numpy as np
 
 router = APIRouter(prefix="/api/predict", tags=["predictions"])
 
-# Load ML models (will be created later)
-MODEL_DIR = os.path.join(os.path.dirname(__file__), "../../ml/models")
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+BATCH_CHUNK_ROWS = 1000
 
-def load_models():
-    """Load trained ML models"""
-    try:
-        priority_model = joblib.load(os.path.join(MODEL_DIR, "priority_model.pkl"))
-        recovery_model = joblib.load(os.path.join(MODEL_DIR, "recovery_model.pkl"))
-        return priority_model, recovery_model
-    except:
-        return None, None
+_request_list = TypeAdapter(List[PredictionRequest])
+
+# Single-case results keyed on the model version and the features; a model
+# reload changes the version so stale entries are never read again
+prediction_cache = TTLCache(
+    maxsize=int(os.getenv("PREDICTION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "300")),
+)
+
+def _cache_key(kind: str, version, request: PredictionRequest):
+    return (
+        kind,
+        version,
+        request.amount,
+        request.overdue_days,
+        request.customer_segment == "premium",
+        request.previous_defaults or 0,
+    )
 
 @router.post("/priority", response_model=PredictionResponse)
 def predict_priority(request: PredictionRequest):
     """Predict case priority using ML model"""
-    priority_model, _ = load_models()
-    
-    if priority_model is None:
-        # Fallback to rule-based prediction
-        if request.amount > 50000 or request.overdue_days > 90:
-            priority = "High"
-            confidence = 0.85
-        elif request.amount > 20000 or request.overdue_days > 60:
-            priority = "Medium"
-            confidence = 0.75
-        else:
-            priority = "Low"
-            confidence = 0.70
-    else:
-        # Use ML model
-        features = np.array([[
-            request.amount,
-            request.overdue_days,
-            1 if request.customer_segment == "premium" else 0,
-            request.previous_defaults
-        ]])
-        priority = priority_model.predict(features)[0]
-        confidence = max(priority_model.predict_proba(features)[0])
-    
-    return PredictionResponse(
-        priority=priority,
-        confidence=round(confidence, 2)
-    )
+    models = registry.get()
+    key = _cache_key("priority", models.version, request)
+    result = prediction_cache.get(key)
+    if result is None:
+        priority, confidence = score_priority(models, build_matrix([request]))
+        result = PredictionResponse(
+            priority=str(priority[0]),
+            confidence=round(float(confidence[0]), 2)
+        )
+        prediction_cache.set(key, result)
+
+    return result
 
 @router.post("/recovery", response_model=PredictionResponse)
 def predict_recovery(request: PredictionRequest):
     """Predict recovery probability using ML model"""
-    _, recovery_model = load_models()
-    
-    if recovery_model is None:
-        # Fallback to rule-based prediction
-        base_prob = 0.8
-        
-        # Adjust based on overdue days
-        if request.overdue_days > 90:
-            base_prob -= 0.3
-        elif request.overdue_days > 60:
-            base_prob -= 0.15
-        
-        # Adjust based on amount
-        if request.amount > 100000:
-            base_prob -= 0.1
-        
-        recovery_probability = max(0.1, min(0.95, base_prob))
-        confidence = 0.70
-    else:
-        # Use ML model
-        features = np.array([[
-            request.amount,
-            request.overdue_days,
-            1 if request.customer_segment == "premium" else 0,
-            request.previous_defaults
-        ]])
-        recovery_probability = recovery_model.predict(features)[0]
-        confidence = 0.85
-    
-    return PredictionResponse(
-        recovery_probability=round(recovery_probability, 2),
-        confidence=round(confidence, 2)
-    )
+    models = registry.get()
+    key = _cache_key("recovery", models.version, request)
+    result = prediction_cache.get(key)
+    if result is None:
+        recovery_probability, confidence = score_recovery(models, build_matrix([request]))
+        result = PredictionResponse(
+            recovery_probability=round(float(recovery_probability[0]), 2),
+            confidence=round(float(confidence[0]), 2)
+        )
+        prediction_cache.set(key, result)
+
+    return result
 
 @router.post("/full")
 def predict_full(request: PredictionRequest):
     """Get both priority and recovery predictions"""
     priority_result = predict_priority(request)
     recovery_result = predict_recovery(request)
-    
+
     return {
         "priority": priority_result.priority,
         "recovery_probability": recovery_result.recovery_probability,
         "priority_confidence": priority_result.confidence,
         "recovery_confidence": recovery_result.confidence
     }
+
+def parse_batch(body: bytes, ndjson: bool) -> List[PredictionRequest]:
+    """Validate a JSON array or NDJSON body into PredictionRequests"""
+    if not ndjson:
+        return _request_list.validate_json(body)
+
+    requests = []
+    for line_number, line in enumerate(body.splitlines()):
+        if not line.strip():
+            continue
+        try:
+            requests.append(PredictionRequest.model_validate_json(line))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail={"line": line_number, "errors": e.errors(include_url=False)})
+    return requests
+
+def score_batch(requests: List[PredictionRequest]):
+    """Score every request with one vectorized call per model"""
+    if not requests:
+        return [], [], [], []
+    models = registry.get()
+    features = build_matrix(requests)
+    priority, priority_confidence = score_priority(models, features)
+    recovery, recovery_confidence = score_recovery(models, features)
+    return (
+        priority.tolist(),
+        np.round(recovery, 2).tolist(),
+        np.round(priority_confidence, 2).tolist(),
+        np.round(recovery_confidence, 2).tolist(),
+    )
+
+def _stream_results(results, ndjson: bool):
+    priority, recovery, priority_confidence, recovery_confidence = results
+    total = len(priority)
+    if not ndjson:
+        yield "["
+    for start in range(0, total, BATCH_CHUNK_ROWS):
+        lines = [
+            json.dumps({
+                "index": i,
+                "priority": priority[i],
+                "recovery_probability": recovery[i],
+                "priority_confidence": priority_confidence[i],
+                "recovery_confidence": recovery_confidence[i]
+            })
+            for i in range(start, min(start + BATCH_CHUNK_ROWS, total))
+        ]
+        if ndjson:
+            yield "\n".join(lines) + "\n"
+        else:
+            yield ("," if start else "") + ",".join(lines)
+    if not ndjson:
+        yield "]"
+
+@router.post(
+    "/batch",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/PredictionRequest"}}
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def predict_batch(request: Request):
+    """Score many cases at once from a JSON array or NDJSON body.
+
+    Results stream back in input order, in the same format as the body.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    ndjson = content_type in NDJSON_MEDIA_TYPES or body.lstrip()[:1] == b"{"
+
+    try:
+        requests = await run_in_threadpool(parse_batch, body, ndjson)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+    results = await run_in_threadpool(score_batch, requests)
+    media_type = "application/x-ndjson" if ndjson else "application/json"
+    return StreamingResponse(_stream_results(results, ndjson), media_type=media_type)
+
+@router.get("/status")
+def get_model_status():
+    """Report the loaded model version, load time and prediction cache counters"""
+    return {**registry.status(), "cache": prediction_cache.stats()}
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db, User
+from ..models import CaseLeaseResponse
+from .. import work_queue
+from .auth import get_current_user
+
+router = APIRouter(prefix="/api/queue", tags=["queue"])
+
+@router.post("/lease", response_model=CaseLeaseResponse, responses={204: {"description": "No case available"}})
+async def lease_next_case(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Lease the highest-value available case to the current agent.
+
+    Ack the lease when done with the case, or release it to hand it back;
+    otherwise it expires and the case returns to the queue.
+    """
+    leased = await work_queue.lease_next(db, current_user.email)
+    if leased is None:
+        return Response(status_code=204)
+    case, lease, score = leased
+    return {"lease_id": lease.lease_id, "expires_at": lease.expires_at, "score": round(score, 2), "case": case}
+
+@router.post("/leases/{lease_id}/ack")
+async def ack_lease(lease_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Finish a leased case"""
+    if not await work_queue.ack(db, lease_id, current_user.email):
+        raise HTTPException(status_code=404, detail="Lease not found or expired")
+    return {"message": "Lease acknowledged"}
+
+@router.post("/leases/{lease_id}/release")
+async def release_lease(lease_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Hand a leased case back to the queue"""
+    if not await work_queue.release(db, lease_id, current_user.email):
+        raise HTTPException(status_code=404, detail="Lease not found or expired")
+    return {"message": "Lease released"}
+
+@router.get("/status")
+def get_queue_status():
+    """Report this worker's queue size and counters"""
+    return work_queue.work_queue.status()
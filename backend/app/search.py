@@ -0,0 +1,150 @@
+"""Full-text and prefix search over case ids and customer names.
+
+SQLite keeps an FTS5 index (`cases_fts`) over cases.id and
+cases.customer_name, maintained by triggers so every write path, including
+bulk inserts, stays in sync. PostgreSQL uses a GIN index over the same text
+as a tsvector. Anything else falls back to prefix LIKE.
+
+Case-id style queries ("CASE-12", "case 12") are answered from the primary
+key index as a range scan, which stays fast no matter how many ids share the
+"CASE" token.
+
+SQLite may renumber rowids on VACUUM, which the FTS index is keyed on; run
+`python -m app.search rebuild` after a VACUUM.
+"""
+import re
+import sys
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .database import Case
+
+_CASE_ID = re.compile(r"^\s*case[\s\-_]*(\d*)\s*$", re.IGNORECASE)
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Very common terms can match most of the book; rank only the first this many
+# matches so latency stays bounded (exact matches on rare terms are unaffected)
+MAX_RANKED_CANDIDATES = 1000
+
+# Words are matched as prefixes from two characters on; one-letter prefixes
+# expand to huge term lists
+MIN_PREFIX_LENGTH = 2
+
+_PG_DOCUMENT = "to_tsvector('simple', coalesce(id, '') || ' ' || coalesce(customer_name, ''))"
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts USING fts5(
+        id, customer_name, content='cases', content_rowid='rowid', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS cases_fts_ai AFTER INSERT ON cases BEGIN
+        INSERT INTO cases_fts(rowid, id, customer_name) VALUES (new.rowid, new.id, new.customer_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cases_fts_ad AFTER DELETE ON cases BEGIN
+        INSERT INTO cases_fts(cases_fts, rowid, id, customer_name)
+        VALUES ('delete', old.rowid, old.id, old.customer_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cases_fts_au AFTER UPDATE OF id, customer_name ON cases BEGIN
+        INSERT INTO cases_fts(cases_fts, rowid, id, customer_name)
+        VALUES ('delete', old.rowid, old.id, old.customer_name);
+        INSERT INTO cases_fts(rowid, id, customer_name) VALUES (new.rowid, new.id, new.customer_name);
+    END""",
+]
+
+
+def install_search_index(engine: Engine) -> None:
+    """Create the search index for this database if it doesn't exist yet"""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cases_fts'")
+            ).first()
+            for statement in SQLITE_DDL:
+                conn.execute(text(statement))
+            if not exists:
+                conn.execute(text("INSERT INTO cases_fts(cases_fts) VALUES ('rebuild')"))
+        elif dialect == "postgresql":
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_cases_search ON cases USING gin ({_PG_DOCUMENT})"))
+
+
+def drop_search_triggers(engine: Engine) -> None:
+    """Stop maintaining the index row by row, e.g. for a bulk load.
+
+    install_search_index() puts the triggers back and rebuild_search_index()
+    then indexes everything written meanwhile in one pass.
+    """
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            for trigger in ("cases_fts_ai", "cases_fts_ad", "cases_fts_au"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO cases_fts(cases_fts) VALUES ('rebuild')"))
+
+
+def search_cases(db: Session, q: str, limit: int = 20) -> List[Case]:
+    """Best matches for q, by case-id prefix or ranked name/id tokens"""
+    id_match = _CASE_ID.match(q)
+    if id_match:
+        return _search_case_ids(db, f"CASE-{id_match.group(1)}", limit)
+
+    tokens = _TOKEN.findall(q.lower())
+    if not tokens:
+        return []
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        match = " ".join(f'"{token}"' + ("*" if len(token) >= MIN_PREFIX_LENGTH else "") for token in tokens)
+        statement = text(
+            "SELECT cases.* FROM ("
+            "  SELECT rowid, rank FROM cases_fts WHERE cases_fts MATCH :match LIMIT :candidates"
+            ") AS hits JOIN cases ON cases.rowid = hits.rowid ORDER BY hits.rank LIMIT :limit"
+        )
+        return db.query(Case).from_statement(statement).params(
+            match=match, candidates=MAX_RANKED_CANDIDATES, limit=limit
+        ).all()
+    if dialect == "postgresql":
+        tsquery = " & ".join(token + (":*" if len(token) >= MIN_PREFIX_LENGTH else "") for token in tokens)
+        statement = text(
+            f"SELECT hits.* FROM ("
+            f"  SELECT cases.*, ts_rank({_PG_DOCUMENT}, to_tsquery('simple', :tsquery)) AS score"
+            f"  FROM cases WHERE {_PG_DOCUMENT} @@ to_tsquery('simple', :tsquery) LIMIT :candidates"
+            f") AS hits ORDER BY hits.score DESC LIMIT :limit"
+        )
+        return db.query(Case).from_statement(statement).params(
+            tsquery=tsquery, candidates=MAX_RANKED_CANDIDATES, limit=limit
+        ).all()
+
+    query = db.query(Case)
+    for token in tokens:
+        query = query.filter(Case.customer_name.ilike(f"%{token}%") | Case.id.ilike(f"{token}%"))
+    return query.limit(limit).all()
+
+
+def _search_case_ids(db: Session, prefix: str, limit: int) -> List[Case]:
+    # prefix <= id < next prefix, e.g. CASE-12 <= id < CASE-13
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return (
+        db.query(Case)
+        .filter(Case.id >= prefix, Case.id < upper)
+        .order_by(Case.id)
+        .limit(limit)
+        .all()
+    )
+
+
+if __name__ == "__main__":
+    from .database import engine, init_db
+
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m app.search rebuild")
+    init_db()
+    install_search_index(engine)
+    rebuild_search_index(engine)
+    print("Search index rebuilt")
@@ -0,0 +1,219 @@
+"""SLA sweeper: keeps overdue_days and the SLA breach flags current.
+
+Every SLA_SWEEP_INTERVAL_SECONDS (300) each worker tries to claim the sweep
+in `job_state`; the claim is a compare-and-set on the last run time, so only
+one worker sweeps per interval. A sweep is a handful of set-based updates:
+
+- Ageing: cases remember the day their overdue_days was last brought up to
+  date (overdue_as_of). Once per day, one UPDATE per distinct stale day adds
+  the elapsed days to every open or in-progress case and re-stamps the rest.
+  The ageing bucket and SLA rollup dimensions are then rebuilt.
+- New SLAs: cases created since the last run that have no SLA row get one,
+  due SLA_BREACH_DAYS after they fell overdue.
+- Flags: is_breached / is_critical are set on SLAs whose deadline (or
+  deadline plus the critical grace period) passed since the last run. The
+  sla_deadline index turns that into a range scan over just those rows.
+
+    python -m app.sla
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy import case, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import data_version, rollup
+from .ageing import SLA_BREACH_DAYS, SLA_CRITICAL_DAYS
+from .allocation import ACTIVE_STATUSES
+from .database import SLA, Case, JobState, SessionLocal
+from .work_queue import work_queue
+from .events import broker
+
+logger = logging.getLogger(__name__)
+
+SLA_SWEEP_INTERVAL_SECONDS = float(os.getenv("SLA_SWEEP_INTERVAL_SECONDS", "300"))
+JOB_NAME = "sla_sweep"
+CRITICAL_GRACE = timedelta(days=SLA_CRITICAL_DAYS - SLA_BREACH_DAYS)
+# Re-check cases created slightly before the last run, in case their
+# transaction committed after it; the anti-join keeps this idempotent
+CREATED_OVERLAP = timedelta(minutes=5)
+INSERT_CHUNK_ROWS = 5000
+
+last_result: Optional[dict] = None
+
+
+def _claim(db: Session, now: datetime, min_gap: float):
+    """Take this interval's sweep; returns (claimed, previous run time)"""
+    state = db.get(JobState, JOB_NAME)
+    if state is None:
+        db.add(JobState(name=JOB_NAME, last_run_at=None))
+        try:
+            db.flush()
+        except IntegrityError:
+            # Another worker created the row first and is sweeping
+            db.rollback()
+            return False, None
+        previous = None
+    else:
+        previous = state.last_run_at
+        if previous is not None and (now - previous).total_seconds() < min_gap:
+            return False, previous
+    result = db.execute(
+        update(JobState)
+        .where(
+            JobState.name == JOB_NAME,
+            JobState.last_run_at.is_(None) if previous is None else JobState.last_run_at == previous,
+        )
+        .values(last_run_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1, previous
+
+
+def age_cases(db: Session, today) -> int:
+    """Bring overdue_days up to today; returns the number of cases re-stamped"""
+    table = Case.__table__
+    # Rows from before overdue_as_of existed: assume they were current today
+    touched = db.execute(
+        update(table).where(table.c.overdue_as_of.is_(None))
+        .values(overdue_as_of=today, updated_at=table.c.updated_at)
+    ).rowcount
+    stale_days = db.execute(
+        select(Case.overdue_as_of).where(Case.overdue_as_of < today).distinct()
+    ).scalars().all()
+    for as_of in stale_days:
+        elapsed = (today - as_of).days
+        touched += db.execute(
+            update(table).where(table.c.overdue_as_of == as_of).values(
+                overdue_days=case(
+                    (table.c.status.in_(ACTIVE_STATUSES), table.c.overdue_days + elapsed),
+                    else_=table.c.overdue_days,
+                ),
+                overdue_as_of=today,
+                # Ageing isn't an edit; keep updated_at meaningful
+                updated_at=table.c.updated_at,
+            )
+        ).rowcount
+    return touched
+
+
+def sla_deadline(overdue_days: Optional[int], as_of) -> datetime:
+    """A case breaches once it is more than SLA_BREACH_DAYS overdue"""
+    due = datetime.combine(as_of, time()) - timedelta(days=overdue_days or 0)
+    return due + timedelta(days=SLA_BREACH_DAYS + 1)
+
+
+def create_missing_slas(db: Session, now: datetime, since: Optional[datetime]) -> int:
+    query = (
+        select(Case.id, Case.overdue_days, Case.overdue_as_of)
+        .outerjoin(SLA, SLA.case_id == Case.id)
+        .where(SLA.id.is_(None))
+    )
+    if since is not None:
+        query = query.where(Case.created_at > since - CREATED_OVERLAP)
+    created = 0
+    rows = db.execute(query).all()
+    for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+        values = []
+        for case_id, overdue_days, as_of in rows[start:start + INSERT_CHUNK_ROWS]:
+            deadline = sla_deadline(overdue_days, as_of or now.date())
+            values.append({
+                "case_id": case_id,
+                "sla_deadline": deadline,
+                "is_breached": deadline <= now,
+                "is_critical": deadline + CRITICAL_GRACE <= now,
+            })
+        db.execute(SLA.__table__.insert(), values)
+        created += len(values)
+    return created
+
+
+def flag_breaches(db: Session, now: datetime, since: Optional[datetime]) -> dict:
+    """Set breach flags on SLAs whose thresholds passed in (since, now]"""
+    counts = {}
+    for flag, grace in (("is_breached", timedelta(0)), ("is_critical", CRITICAL_GRACE)):
+        column = getattr(SLA, flag)
+        window = [SLA.sla_deadline <= now - grace]
+        if since is not None:
+            window.append(SLA.sla_deadline > since - grace)
+        counts[flag] = db.execute(
+            update(SLA)
+            .where(*window, or_(column.is_(None), column.is_(False)))
+            .values({flag: True})
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return counts
+
+
+def sweep(db: Session, now: Optional[datetime] = None, min_gap: float = 0) -> Optional[dict]:
+    """Run one sweep and commit; returns a summary, or None if another worker has this interval"""
+    global last_result
+    now = now or datetime.utcnow()
+    claimed, previous = _claim(db, now, min_gap)
+    if not claimed:
+        db.rollback()
+        return None
+
+    aged = age_cases(db, now.date())
+    created = create_missing_slas(db, now, previous)
+    flagged = flag_breaches(db, now, previous)
+    if aged:
+        # Ageing moved cases between buckets; rebuild those slices (commits)
+        rollup.rebuild(db, ("bucket", "sla"))
+        # ...and changed their SLA proximity in the work queue
+        work_queue.mark_stale()
+        broker.publish_threadsafe("resync", {"reason": "sla_ageing"})
+    else:
+        if created or any(flagged.values()):
+            data_version.bump(db)
+        db.commit()
+        if any(flagged.values()):
+            # Breach counts aren't in the per-case events; have dashboards re-fetch
+            broker.publish_threadsafe("resync", {"reason": "sla_breaches"})
+
+    last_result = {
+        "ran_at": now.isoformat(),
+        "previous_run_at": previous.isoformat() if previous else None,
+        "cases_aged": aged,
+        "slas_created": created,
+        "newly_breached": flagged["is_breached"],
+        "newly_critical": flagged["is_critical"],
+        "seconds": round((datetime.utcnow() - now).total_seconds(), 3),
+    }
+    return last_result
+
+
+def _sweep_once():
+    db = SessionLocal()
+    try:
+        # Leave a little slack so workers on the same schedule don't all miss
+        return sweep(db, min_gap=SLA_SWEEP_INTERVAL_SECONDS * 0.9)
+    finally:
+        db.close()
+
+
+async def run_sweeper(interval: float = SLA_SWEEP_INTERVAL_SECONDS) -> None:
+    """Sweep forever on the request threadpool; started from the app's startup"""
+    while True:
+        try:
+            await run_in_threadpool(_sweep_once)
+        except Exception:
+            logger.exception("SLA sweep failed")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    from .database import init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        print(json.dumps(sweep(db), indent=2))
+    finally:
+        db.close()
@@ -0,0 +1,58 @@
+"""Array-based evaluator for compiled tree ensembles.
+
+`ml/export_trees.py` flattens a trained RandomForestClassifier or
+GradientBoostingRegressor (plus its StandardScaler) into a handful of NumPy
+node arrays, published as a model bundle (see model_bundle.py). Evaluating
+them walks every tree at once, one level per iteration, which avoids
+sklearn's input validation and per-estimator Python loop. That makes single
+rows and small batches several times cheaper. Larger batches are walked
+CHUNK_ROWS rows at a time to bound the (trees x rows) node index arrays.
+
+Leaves point back at themselves, so walking `depth` levels always lands on a
+leaf no matter how deep each individual tree is.
+"""
+import numpy as np
+
+CHUNK_ROWS = 4096
+
+ARRAY_FIELDS = (
+    "feature", "threshold", "left", "right", "value", "roots",
+    "scaler_mean", "scaler_scale", "classes",
+)
+
+
+class CompiledEnsemble:
+    def __init__(self, arrays):
+        for name in ARRAY_FIELDS:
+            setattr(self, name, arrays[name])
+        self.kind = str(arrays["kind"])
+        self.depth = int(arrays["depth"])
+        self.baseline = float(arrays["baseline"])
+        self.n_features_in_ = int(arrays["n_features"])
+        self.source_sha1 = str(arrays["source_sha1"])
+
+    def _leaves(self, X):
+        # sklearn compares float32 inputs against float64 thresholds
+        X = ((np.asarray(X, dtype=float) - self.scaler_mean) / self.scaler_scale).astype(np.float32)
+        rows = np.arange(X.shape[0])
+        nodes = np.repeat(self.roots[:, None], X.shape[0], axis=1)
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def _chunked(self, fn, X):
+        X = np.asarray(X, dtype=float)
+        if len(X) <= CHUNK_ROWS:
+            return fn(X)
+        return np.concatenate([fn(X[i:i + CHUNK_ROWS]) for i in range(0, len(X), CHUNK_ROWS)])
+
+    def predict_proba(self, X):
+        """Class probabilities, averaged over the forest's trees"""
+        return self._chunked(lambda chunk: self.value[self._leaves(chunk)].mean(axis=0), X)
+
+    def predict(self, X):
+        if self.kind == "classifier":
+            return self.classes[self.predict_proba(X).argmax(axis=1)]
+        # Boosting: leaf values were pre-multiplied by the learning rate
+        return self._chunked(lambda chunk: self.baseline + self.value[self._leaves(chunk), 0].sum(axis=0), X)
@@ -0,0 +1,281 @@
+"""Next-best-case work queue for collection agents.
+
+Open and in-progress cases sit in an in-memory max-heap ordered by expected
+recovered value:
+
+    amount * recovery_probability * priority weight * SLA proximity
+
+so handing out the next case is a heap pop rather than a sorted table scan.
+Updates push a fresh heap entry and leave the old one behind; stale entries
+are skipped when popped (and compacted away when they pile up).
+
+Handing a case out takes a lease: a row in `case_leases` keyed on the case,
+so two agents never hold the same case even when they hit different
+workers. A lease expires after WORK_QUEUE_LEASE_SECONDS (900) unless the
+agent acks it (done; the case stays out of the queue for
+WORK_QUEUE_COOLDOWN_SECONDS, 86400) or releases it (back in the queue now).
+
+The case routes push create/update/allocate events into this worker's heap;
+writes from other workers, bulk ingest, batch allocation and the SLA
+sweeper are picked up by a resync every WORK_QUEUE_RESYNC_SECONDS (120).
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import and_, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .ageing import SLA_BREACH_DAYS
+from .allocation import ACTIVE_STATUSES
+from .database import Case, CaseLease
+
+LEASE_SECONDS = float(os.getenv("WORK_QUEUE_LEASE_SECONDS", "900"))
+COOLDOWN_SECONDS = float(os.getenv("WORK_QUEUE_COOLDOWN_SECONDS", "86400"))
+RESYNC_SECONDS = float(os.getenv("WORK_QUEUE_RESYNC_SECONDS", "120"))
+
+PRIORITY_WEIGHTS = {"High": 1.5, "Medium": 1.0, "Low": 0.6}
+# Unscored cases are valued as a coin flip rather than dropped to the bottom
+DEFAULT_RECOVERY = 0.5
+# Cases within this many days of breaching their SLA get up to 2x weight;
+# already breached cases keep a smaller boost
+SLA_WINDOW_DAYS = 30
+BREACHED_WEIGHT = 1.25
+
+
+def sla_weight(overdue_days: Optional[int]) -> float:
+    days_left = SLA_BREACH_DAYS - (overdue_days or 0)
+    if days_left < 0:
+        return BREACHED_WEIGHT
+    if days_left <= SLA_WINDOW_DAYS:
+        return 1 + (SLA_WINDOW_DAYS - days_left) / SLA_WINDOW_DAYS
+    return 1.0
+
+
+def case_score(amount, recovery_probability, priority, overdue_days) -> float:
+    recovery = DEFAULT_RECOVERY if recovery_probability is None else recovery_probability
+    return (amount or 0) * recovery * PRIORITY_WEIGHTS.get(priority, 1.0) * sla_weight(overdue_days)
+
+
+class WorkQueue:
+    def __init__(self, resync_seconds: float = RESYNC_SECONDS):
+        self.resync_seconds = resync_seconds
+        self._heap = []     # (-score, seq, case_id); may hold stale entries
+        self._live = {}     # case_id -> (seq, score) of its current entry
+        self._out = {}      # case_id -> (until, score) while leased, acked or held by another worker
+        self._returns = []  # (until, case_id) heap of when out cases come back
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._synced_at = None
+        self._stale = True
+        self.pops = 0
+        self.resyncs = 0
+
+    def needs_sync(self) -> bool:
+        return (
+            self._stale
+            or self._synced_at is None
+            or time.monotonic() - self._synced_at > self.resync_seconds
+        )
+
+    def mark_stale(self) -> None:
+        """Resync before the next pop, e.g. after a bulk write"""
+        self._stale = True
+
+    def load(self, rows: Iterable[Tuple[str, float]]) -> None:
+        """Replace the queue with (case_id, score) rows of every available case"""
+        now = datetime.utcnow()
+        with self._lock:
+            self._return_due(now)
+            self._live = {}
+            self._heap = []
+            for case_id, score in rows:
+                if case_id in self._out:
+                    continue
+                seq = next(self._seq)
+                self._live[case_id] = (seq, score)
+                self._heap.append((-score, seq, case_id))
+            heapq.heapify(self._heap)
+            self._synced_at = time.monotonic()
+            self._stale = False
+            self.resyncs += 1
+
+    def upsert(self, case) -> None:
+        """Apply a case create/update event"""
+        with self._lock:
+            if case.status not in ACTIVE_STATUSES:
+                self._live.pop(case.id, None)
+                return
+            score = case_score(case.amount, case.recovery_probability, case.priority, case.overdue_days)
+            if case.id in self._out:
+                until, _ = self._out[case.id]
+                self._out[case.id] = (until, score)
+                return
+            self._push(case.id, score)
+
+    def pop(self) -> Optional[Tuple[str, float]]:
+        """Take the highest-value available case off the queue"""
+        with self._lock:
+            self._return_due(datetime.utcnow())
+            while self._heap:
+                _, seq, case_id = heapq.heappop(self._heap)
+                live = self._live.get(case_id)
+                if live is None or live[0] != seq:
+                    continue
+                del self._live[case_id]
+                self.pops += 1
+                return case_id, live[1]
+            return None
+
+    def hold(self, case_id: str, score: float, until: datetime) -> None:
+        """Keep a case out of the queue until `until`"""
+        with self._lock:
+            self._live.pop(case_id, None)
+            self._out[case_id] = (until, score)
+            heapq.heappush(self._returns, (until, case_id))
+
+    def drop(self, case_id: str) -> None:
+        with self._lock:
+            self._live.pop(case_id, None)
+            self._out.pop(case_id, None)
+
+    def status(self) -> dict:
+        return {
+            "queued": len(self._live),
+            "out": len(self._out),
+            "heap_entries": len(self._heap),
+            "pops": self.pops,
+            "resyncs": self.resyncs,
+            "stale": self.needs_sync(),
+        }
+
+    def _push(self, case_id: str, score: float) -> None:
+        seq = next(self._seq)
+        self._live[case_id] = (seq, score)
+        heapq.heappush(self._heap, (-score, seq, case_id))
+        if len(self._heap) > 2 * len(self._live) + 1000:
+            self._heap = [(-s, q, c) for c, (q, s) in self._live.items()]
+            heapq.heapify(self._heap)
+
+    def _return_due(self, now: datetime) -> None:
+        while self._returns and self._returns[0][0] <= now:
+            until, case_id = heapq.heappop(self._returns)
+            entry = self._out.get(case_id)
+            # A later hold on the same case replaces this one
+            if entry is not None and entry[0] == until:
+                del self._out[case_id]
+                self._push(case_id, entry[1])
+
+
+work_queue = WorkQueue()
+
+
+async def sync(db: AsyncSession) -> None:
+    """Reload every active case that nobody holds a live lease on"""
+    rows = await db.execute(
+        select(Case.id, Case.amount, Case.recovery_probability, Case.priority, Case.overdue_days)
+        .outerjoin(CaseLease, and_(CaseLease.case_id == Case.id, CaseLease.expires_at > datetime.utcnow()))
+        .where(Case.status.in_(ACTIVE_STATUSES), CaseLease.case_id.is_(None))
+    )
+    work_queue.load((case_id, case_score(*values)) for case_id, *values in rows)
+
+
+async def _claim(db: AsyncSession, case_id: str, lease: CaseLease, now: datetime):
+    """Record the lease; returns None on success, else when the case frees up"""
+    db.add(lease)
+    try:
+        await db.commit()
+        return None
+    except IntegrityError:
+        await db.rollback()
+    existing = (await db.execute(
+        select(CaseLease.lease_id, CaseLease.expires_at).where(CaseLease.case_id == case_id)
+    )).one_or_none()
+    if existing is None:
+        # Released in the meantime; try it again shortly
+        return now + timedelta(seconds=1)
+    if existing.expires_at > now:
+        return existing.expires_at
+    # Take over an expired lease, unless someone else just did
+    result = await db.execute(
+        update(CaseLease)
+        .where(CaseLease.case_id == case_id, CaseLease.lease_id == existing.lease_id)
+        .values(lease_id=lease.lease_id, agent=lease.agent, expires_at=lease.expires_at, acked=False)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return None if result.rowcount == 1 else now + timedelta(seconds=1)
+
+
+async def lease_next(db: AsyncSession, agent: str):
+    """Lease the best available case to `agent`; returns (case, lease, score) or None"""
+    if work_queue.needs_sync():
+        await sync(db)
+    while True:
+        popped = work_queue.pop()
+        if popped is None:
+            return None
+        case_id, score = popped
+        now = datetime.utcnow()
+        lease = CaseLease(
+            case_id=case_id, lease_id=uuid.uuid4().hex, agent=agent,
+            expires_at=now + timedelta(seconds=LEASE_SECONDS), acked=False,
+        )
+        busy_until = await _claim(db, case_id, lease, now)
+        if busy_until is not None:
+            work_queue.hold(case_id, score, busy_until)
+            continue
+        case = await db.get(Case, case_id)
+        if case is None or case.status not in ACTIVE_STATUSES:
+            # Closed or deleted by another worker since our last sync
+            await db.execute(delete(CaseLease).where(CaseLease.lease_id == lease.lease_id))
+            await db.commit()
+            work_queue.drop(case_id)
+            continue
+        work_queue.hold(case_id, score, lease.expires_at)
+        return case, lease, score
+
+
+async def ack(db: AsyncSession, lease_id: str, agent: str) -> bool:
+    """Mark a leased case as worked; it stays out of the queue for the cooldown"""
+    now = datetime.utcnow()
+    until = now + timedelta(seconds=COOLDOWN_SECONDS)
+    case_id = await db.scalar(
+        update(CaseLease)
+        .where(CaseLease.lease_id == lease_id, CaseLease.agent == agent,
+               CaseLease.expires_at > now, CaseLease.acked.is_(False))
+        .values(acked=True, expires_at=until)
+        .returning(CaseLease.case_id)
+    )
+    await db.commit()
+    if case_id is None:
+        return False
+    case = await db.get(Case, case_id)
+    if case is not None:
+        score = case_score(case.amount, case.recovery_probability, case.priority, case.overdue_days)
+        work_queue.hold(case_id, score, until)
+    return True
+
+
+async def release(db: AsyncSession, lease_id: str, agent: str) -> bool:
+    """Give a leased case back so the next agent can take it"""
+    case_id = await db.scalar(
+        delete(CaseLease)
+        .where(CaseLease.lease_id == lease_id, CaseLease.agent == agent,
+               CaseLease.expires_at > datetime.utcnow(), CaseLease.acked.is_(False))
+        .returning(CaseLease.case_id)
+    )
+    await db.commit()
+    if case_id is None:
+        return False
+    work_queue.drop(case_id)
+    case = await db.get(Case, case_id)
+    if case is not None:
+        work_queue.upsert(case)
+    return True
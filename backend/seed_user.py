@@ -1,6 +1,8 @@
+import asyncio
+
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine, Base
-from app.routes.auth import get_password_hash
+from app.passwords import hash_password
 from app.database import User
 
 def seed_users():
@@ -14,7 +16,7 @@ def seed_users():
         new_user = User(
             email="abc@gmail.com",
             full_name="Admin User",
-            hashed_password=get_password_hash("12345678"),
+            hashed_password=asyncio.run(hash_password("12345678")),
             role="admin"
         )
         db.add(new_user)
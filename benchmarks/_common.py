@@ -0,0 +1,101 @@
+"""Helpers shared by the benchmark scripts"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.database import Base
+
+STATUSES = np.array(['open', 'in_progress', 'resolved', 'closed'])
+PRIORITIES = np.array(['High', 'Medium', 'Low'])
+DCA_NAMES = np.array(['DCA Alpha', 'DCA Beta', 'DCA Gamma'])
+
+# ~60k distinct customer names built from pseudo-words, so term frequencies
+# look more like a real book than "Customer N" would
+_SYLLABLES = ['ka', 'lor', 'ven', 'tri', 'mo', 'sel', 'dan', 'qu', 'rix', 'pa', 'nor', 'est', 'gal', 'tu', 'bre']
+_WORDS = [(a + b).capitalize() for a in _SYLLABLES for b in _SYLLABLES if a != b]
+_SUFFIXES = ['Inc', 'Ltd', 'Corporation', 'Group', 'Logistics', 'Holdings', 'Partners', 'Systems']
+
+
+def customer_name(i):
+    n = len(_WORDS)
+    return f'{_WORDS[i % n]} {_WORDS[(i // n) % n]} {_SUFFIXES[(i // 7) % len(_SUFFIXES)]}'
+
+
+def seeded_engine(path, n_cases, seed=0, chunk_size=100_000):
+    """Create a SQLite database at `path` holding n_cases synthetic cases"""
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(bind=engine)
+
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for start in range(0, n_cases, chunk_size):
+            n = min(chunk_size, n_cases - start)
+            overdue = rng.integers(0, 180, size=n)
+            rows = zip(
+                (f'CASE-{i}' for i in range(start, start + n)),
+                (customer_name(i) for i in range(start, start + n)),
+                np.round(rng.exponential(30000, size=n), 2).tolist(),
+                overdue.tolist(),
+                STATUSES[rng.integers(0, len(STATUSES), size=n)].tolist(),
+                PRIORITIES[rng.integers(0, len(PRIORITIES), size=n)].tolist(),
+                DCA_NAMES[rng.integers(0, len(DCA_NAMES), size=n)].tolist(),
+                np.round(rng.uniform(0.1, 0.95, size=n), 2).tolist(),
+                [now - timedelta(days=int(d)) for d in overdue],
+            )
+            cursor.executemany(
+                'INSERT INTO cases (id, customer_name, amount, overdue_days, status, priority, '
+                'dca_assigned, recovery_probability, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (row + (row[-1],) for row in rows),
+            )
+        raw.commit()
+    finally:
+        raw.close()
+    return engine
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def running_server(script, cwd, env=None):
+    """Run `script --serve PORT` from `cwd` and yield its base URL once /health answers"""
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(script), '--serve', str(port)],
+        cwd=cwd, env={**os.environ, **(env or {})},
+    )
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        # Startup builds the search index and rollup, which takes a while on big books
+        while True:
+            try:
+                httpx.get(f'{base_url}/health').raise_for_status()
+                break
+            except httpx.TransportError:
+                if server.poll() is not None:
+                    sys.exit('server exited during startup')
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,87 @@
+"""Benchmark: /api/analytics/ageing-buckets memory and time vs table size.
+
+Compares the grouped aggregate against the previous implementation (four
+queries that load every Case and sum in Python). Peak Python heap is
+measured with tracemalloc; the aggregate stays flat as the table grows.
+
+Usage: python benchmarks/bench_ageing_buckets.py [--sizes 10000,100000,1000000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from _common import seeded_engine
+
+from app.ageing import AGEING_BUCKETS
+from app.database import Case
+from app.engine import make_async_engine
+from app.routes.analytics import get_ageing_buckets
+
+
+def legacy_ageing_buckets(db):
+    result = []
+    for bucket in AGEING_BUCKETS:
+        query = db.query(Case).filter(Case.overdue_days >= bucket['min'])
+        if bucket['max'] is not None:
+            query = query.filter(Case.overdue_days <= bucket['max'])
+        cases = query.all()
+        result.append({'label': bucket['label'], 'count': len(cases), 'amount': sum(c.amount for c in cases)})
+    return result
+
+
+def measure(fn, engine):
+    with Session(engine) as db:
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn(db)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+async def measure_async(handler, url):
+    # The route handler is async and takes an AsyncSession, as it does in the app
+    engine = make_async_engine(url)
+    try:
+        async with AsyncSession(engine) as db:
+            await db.connection()  # open the connection outside the timed section
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = await handler(db)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        await engine.dispose()
+    return result, elapsed, peak
+
+
+def main(sizes, legacy_max):
+    print(f"{'cases':>10}{'impl':>10}{'time s':>10}{'peak MiB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f'bench_{size}.db')
+            engine = seeded_engine(path, size)
+            result, elapsed, peak = asyncio.run(measure_async(get_ageing_buckets, f'sqlite:///{path}'))
+            print(f"{size:>10}{'grouped':>10}{elapsed:>10.3f}{peak / 2**20:>10.2f}")
+            if size <= legacy_max:
+                legacy, elapsed, peak = measure(legacy_ageing_buckets, engine)
+                assert [b['count'] for b in legacy] == [b['count'] for b in result]
+                print(f"{size:>10}{'legacy':>10}{elapsed:>10.3f}{peak / 2**20:>10.2f}")
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--legacy-max', type=int, default=100000,
+                        help='largest table to run the old row-loading implementation on')
+    args = parser.parse_args()
+    main([int(s) for s in args.sizes.split(',')], args.legacy_max)
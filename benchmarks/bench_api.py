@@ -0,0 +1,294 @@
+"""End-to-end API benchmark: latency, throughput and peak RSS per endpoint.
+
+For each book size in --sizes, seeds a SQLite database once (synthetic
+cases plus a login user, fixed seed) and drives the main endpoints with
+--concurrency clients for --duration seconds each, after a short warm-up:
+
+    inprocess   httpx.ASGITransport against the app in a child process, so
+                the numbers exclude sockets and HTTP parsing
+    uvicorn     real HTTP against a one-worker uvicorn server
+
+Each mode gets its own copy of the seeded database and waits for the first
+SLA sweep, so every run measures the same book. Reported per scenario:
+requests, errors (any status >= 400), throughput, p50/p95/p99 latency and
+the serving process's peak RSS so far (in-process, that includes the load
+generator).
+
+Results go to --output as JSON. Pass --compare with an earlier results file
+to print the p50 and throughput change of every scenario.
+
+Usage: python benchmarks/bench_api.py [--sizes 10000,100000,1000000] [--modes inprocess,uvicorn]
+                                      [--concurrency 16] [--duration 5] [--output results.json]
+                                      [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+from _common import running_server, seeded_engine
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+EMAIL = 'bench@example.com'
+PASSWORD = 'bench-password'
+SIZES = [10_000, 100_000, 1_000_000]
+MODES = ['inprocess', 'uvicorn']
+WARMUP_SECONDS = 1.0
+
+
+def _prediction(i):
+    # Vary the features so the single-case prediction cache doesn't answer everything
+    return {'amount': 1000 + (i * 7919) % 90000, 'overdue_days': i % 150, 'previous_defaults': i % 3}
+
+
+BATCH_BODY = [_prediction(i) for i in range(1000)]
+
+# name -> function(request number, number of cases, auth headers) -> httpx request kwargs
+SCENARIOS = {
+    'case_list': lambda i, n, auth: {'method': 'GET', 'url': '/api/cases/?limit=50'},
+    'case_list_1000': lambda i, n, auth: {'method': 'GET', 'url': '/api/cases/?limit=1000'},
+    'case_filter': lambda i, n, auth: {
+        'method': 'GET', 'url': '/api/cases/?status=open&priority=High&min_amount=10000&sort=amount&limit=50',
+    },
+    'case_get': lambda i, n, auth: {'method': 'GET', 'url': f'/api/cases/CASE-{(i * 7919) % n}'},
+    'case_search': lambda i, n, auth: {'method': 'GET', 'url': '/api/cases/search?q=kalor&limit=20'},
+    'analytics_summary': lambda i, n, auth: {'method': 'GET', 'url': '/api/analytics/summary'},
+    'analytics_ageing': lambda i, n, auth: {'method': 'GET', 'url': '/api/analytics/ageing-buckets'},
+    'predict_priority': lambda i, n, auth: {'method': 'POST', 'url': '/api/predict/priority', 'json': _prediction(i)},
+    'predict_batch_1000': lambda i, n, auth: {'method': 'POST', 'url': '/api/predict/batch', 'json': BATCH_BODY},
+    'users_me': lambda i, n, auth: {'method': 'GET', 'url': '/api/users/me', 'headers': auth},
+    'login': lambda i, n, auth: {
+        'method': 'POST', 'url': '/api/token', 'data': {'username': EMAIL, 'password': PASSWORD},
+    },
+}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20, 1)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+async def drive(client, scenario, n_cases, auth, concurrency, duration):
+    build = SCENARIOS[scenario]
+    counter = itertools.count()
+    timings, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            request = build(next(counter), n_cases, auth)
+            start = time.perf_counter()
+            response = await client.request(**request)
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                timings.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    timings.sort()
+    return {
+        'requests': len(timings) + errors,
+        'errors': errors,
+        'rps': round(len(timings) / wall, 1),
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+    }
+
+
+async def run_scenarios(client, n_cases, scenarios, concurrency, duration, rss):
+    # The first SLA sweep ages the seeded book; measure after it
+    while (await client.get('/api/analytics/sla-sweeper')).json()['last_run'] is None:
+        await asyncio.sleep(0.2)
+    token = (await client.post('/api/token', data={'username': EMAIL, 'password': PASSWORD})).json()
+    auth = {'Authorization': f"Bearer {token['access_token']}"}
+
+    results = []
+    for scenario in scenarios:
+        await drive(client, scenario, n_cases, auth, concurrency, WARMUP_SECONDS)
+        result = await drive(client, scenario, n_cases, auth, concurrency, duration)
+        result.update(scenario=scenario, peak_rss_mb=await rss())
+        results.append(result)
+        print(f"  {scenario:<20}{result['rps']:>9.1f} req/s  p50 {result['p50_ms'] or 0:>8.2f}  "
+              f"p95 {result['p95_ms'] or 0:>8.2f}  p99 {result['p99_ms'] or 0:>8.2f} ms  "
+              f"errors {result['errors']}", file=sys.stderr)
+    return results
+
+
+# In-process mode runs in a child started from the seeded directory, since
+# the app opens ./fedex_dca.db when it is imported
+
+async def inprocess(n_cases, scenarios, concurrency, duration):
+    from app.main import app
+
+    await app.router.startup()
+    try:
+        limits = httpx.Limits(max_connections=concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', limits=limits, timeout=120) as client:
+            async def rss():
+                return peak_rss_mb()
+            return await run_scenarios(client, n_cases, scenarios, concurrency, duration, rss)
+    finally:
+        await app.router.shutdown()
+
+
+def run_inprocess(directory, n_cases, scenarios, concurrency, duration):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', str(n_cases),
+         '--scenarios', ','.join(scenarios), '--concurrency', str(concurrency), '--duration', str(duration)],
+        cwd=directory, stdout=subprocess.PIPE, check=True,
+    ).stdout
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def build_app():
+    from app.main import app
+
+    @app.get('/bench/rss')
+    def bench_rss():
+        return {'peak_rss_mb': peak_rss_mb()}
+
+    return app
+
+
+def serve(port):
+    import uvicorn
+
+    uvicorn.run(build_app(), host='127.0.0.1', port=port, log_level='warning')
+
+
+def run_uvicorn(directory, n_cases, scenarios, concurrency, duration):
+    async def run(base_url):
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+            async def rss():
+                return (await client.get('/bench/rss')).json()['peak_rss_mb']
+            return await run_scenarios(client, n_cases, scenarios, concurrency, duration, rss)
+
+    with running_server(__file__, directory) as base_url:
+        return asyncio.run(run(base_url))
+
+
+def seed(path, n_cases):
+    from sqlalchemy.orm import Session
+
+    from app.database import User
+    from app.passwords import hash_password
+
+    engine = seeded_engine(path, n_cases)
+    with Session(engine) as db:
+        db.add(User(email=EMAIL, full_name='Bench', hashed_password=asyncio.run(hash_password(PASSWORD))))
+        db.commit()
+    engine.dispose()
+
+
+def environment(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'started_at': datetime.utcnow().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'concurrency': args.concurrency,
+        'duration_seconds': args.duration,
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['cases'], r['mode'], r['scenario']): r for r in json.load(f)['results']}
+    print(f"\n{'cases':>9} {'mode':<10}{'scenario':<20}{'p50 ms':>17}{'change':>9}{'req/s':>19}{'change':>9}")
+    for r in results:
+        old = baseline.get((r['cases'], r['mode'], r['scenario']))
+        if old is None or not old['p50_ms'] or not old['rps'] or r['p50_ms'] is None:
+            continue
+        p50_change = (r['p50_ms'] / old['p50_ms'] - 1) * 100
+        rps_change = (r['rps'] / old['rps'] - 1) * 100
+        print(f"{r['cases']:>9} {r['mode']:<10}{r['scenario']:<20}"
+              f"{old['p50_ms']:>8.2f} ->{r['p50_ms']:>7.2f}{p50_change:>+8.1f}%"
+              f"{old['rps']:>9.1f} ->{r['rps']:>8.1f}{rps_change:>+8.1f}%")
+
+
+def main(args):
+    scenarios = args.scenarios.split(',')
+    runners = {'inprocess': run_inprocess, 'uvicorn': run_uvicorn}
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_cases in [int(size) for size in args.sizes.split(',')]:
+            seeded = os.path.join(tmp, 'seed.db')
+            start = time.perf_counter()
+            seed(seeded, n_cases)
+            print(f"seeded {n_cases} cases in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+            for mode in args.modes.split(','):
+                print(f"{n_cases} cases, {mode}:", file=sys.stderr)
+                directory = os.path.join(tmp, mode)
+                os.makedirs(directory, exist_ok=True)
+                shutil.copyfile(seeded, os.path.join(directory, 'fedex_dca.db'))
+                for result in runners[mode](directory, n_cases, scenarios, args.concurrency, args.duration):
+                    results.append({'cases': n_cases, 'mode': mode, **result})
+                shutil.rmtree(directory)
+
+    report = {'environment': environment(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)))
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--output', help='write JSON results here (default: stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='results file from an earlier run to diff against')
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    parser.add_argument('--child', type=int, metavar='CASES', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+    elif args.child:
+        results = asyncio.run(inprocess(args.child, args.scenarios.split(','), args.concurrency, args.duration))
+        print(json.dumps(results))
+    else:
+        main(args)
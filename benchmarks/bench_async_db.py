@@ -0,0 +1,137 @@
+"""Load test: sync vs async database handlers under concurrent requests.
+
+Seeds a SQLite database, starts the API under uvicorn (one worker) and fires
+concurrent requests at pairs of equivalent endpoints:
+
+    /bench/sync/...   the previous handlers, kept here for comparison: a
+                      blocking Session query inside an async dependency, and
+                      plain def routes served from the threadpool
+    /api/...          the async handlers on the aiosqlite engine
+
+Usage: python benchmarks/bench_async_db.py [--cases 100000] [--concurrency 64] [--duration 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from _common import running_server, seeded_engine
+
+EMAIL = 'bench@example.com'
+PASSWORD = 'bench-password'
+
+
+def build_app():
+    from typing import List
+
+    from fastapi import Depends, HTTPException
+    from jose import JWTError, jwt
+    from sqlalchemy.orm import Session
+
+    from app.database import Case, User, get_db
+    from app.main import app
+    from app.models import CaseResponse, UserResponse
+    from app.routes.auth import ALGORITHM, SECRET_KEY, oauth2_scheme
+
+    async def blocking_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+        try:
+            email = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get('sub')
+        except JWTError:
+            raise HTTPException(status_code=401)
+        user = db.query(User).filter(User.email == email).first()
+        if user is None:
+            raise HTTPException(status_code=401)
+        return user
+
+    @app.get('/bench/sync/users/me', response_model=UserResponse)
+    def sync_users_me(current_user: User = Depends(blocking_current_user)):
+        return current_user
+
+    @app.get('/bench/sync/cases', response_model=List[CaseResponse])
+    def sync_cases(limit: int = 50, db: Session = Depends(get_db)):
+        return db.query(Case).order_by(Case.created_at.desc(), Case.id.desc()).limit(limit).all()
+
+    @app.get('/bench/sync/cases/{case_id}', response_model=CaseResponse)
+    def sync_case(case_id: str, db: Session = Depends(get_db)):
+        return db.query(Case).filter(Case.id == case_id).first()
+
+    return app
+
+
+def serve(port):
+    import uvicorn
+
+    uvicorn.run(build_app(), host='127.0.0.1', port=port, log_level='warning')
+
+
+def seed(directory, n_cases):
+    from sqlalchemy.orm import Session
+
+    from app.database import User
+    from app.passwords import hash_password
+
+    engine = seeded_engine(os.path.join(directory, 'fedex_dca.db'), n_cases)
+    with Session(engine) as db:
+        db.add(User(email=EMAIL, full_name='Bench', hashed_password=asyncio.run(hash_password(PASSWORD))))
+        db.commit()
+    engine.dispose()
+
+
+async def load(client, path, headers, concurrency, duration):
+    timings = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    timings.sort()
+    return len(timings) / duration, statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+async def run(base_url, n_cases, concurrency, duration):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        token = (await client.post('/api/token', data={'username': EMAIL, 'password': PASSWORD})).json()
+        headers = {'Authorization': f"Bearer {token['access_token']}"}
+        pairs = [
+            ('users/me', '/bench/sync/users/me', '/api/users/me'),
+            ('case list', '/bench/sync/cases?limit=50', '/api/cases/?limit=50'),
+            ('case by id', f'/bench/sync/cases/CASE-{n_cases // 2}', f'/api/cases/CASE-{n_cases // 2}'),
+        ]
+        print(f"{'endpoint':<12}{'path':<7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, sync_path, async_path in pairs:
+            for label, path in (('sync', sync_path), ('async', async_path)):
+                await load(client, path, headers, concurrency, 1)  # warm up
+                rps, p50, p95 = await load(client, path, headers, concurrency, duration)
+                print(f"{name:<12}{label:<7}{rps:>10.0f}{p50:>10.2f}{p95:>10.2f}")
+
+
+def main(n_cases, concurrency, duration):
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(tmp, n_cases)
+        print(f"seeded {n_cases} cases")
+        # The app opens ./fedex_dca.db, so serve from the seeded directory
+        with running_server(__file__, tmp) as base_url:
+            asyncio.run(run(base_url, n_cases, concurrency, duration))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=100_000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+    else:
+        main(args.cases, args.concurrency, args.duration)
@@ -0,0 +1,91 @@
+"""Benchmark: bytes on the wire and latency with and without HTTP caching.
+
+Seeds a SQLite database, starts the API under uvicorn and fetches each
+endpoint three ways:
+
+    plain        no Accept-Encoding, no validator (the old behaviour)
+    compressed   Accept-Encoding: br, gzip
+    revalidated  compressed, plus If-None-Match with the ETag from the
+                 previous response, which the unchanged book answers with 304
+
+Bytes are response body bytes as received, before decompression.
+
+Usage: python benchmarks/bench_http_cache.py [--cases 100000] [--repeat 50]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from _common import running_server, seeded_engine
+
+ENDPOINTS = [
+    '/api/analytics/summary',
+    '/api/analytics/ageing-buckets',
+    '/api/cases/?limit=100',
+    '/api/cases/?limit=1000',
+    '/api/cases/search?q=kalor&limit=100',
+]
+
+
+def serve(port):
+    import uvicorn
+
+    from app.main import app
+
+    uvicorn.run(app, host='127.0.0.1', port=port, log_level='warning')
+
+
+def measure(client, path, headers, repeat):
+    timings, sizes, status = [], [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        sizes.append(response.num_bytes_downloaded)
+        status = response.status_code
+    timings.sort()
+    return status, statistics.median(sizes), statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def run(base_url, repeat):
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        # The first SLA sweep ages the seeded book and changes the ETag; let it finish
+        while client.get('/api/analytics/sla-sweeper').json()['last_run'] is None:
+            time.sleep(0.2)
+        print(f"{'endpoint':<38}{'mode':<13}{'status':>7}{'bytes':>10}{'p50 ms':>9}{'p95 ms':>9}")
+        for path in ENDPOINTS:
+            compressed = {'Accept-Encoding': 'br, gzip'}
+            etag = client.get(path, headers=compressed).headers.get('etag')
+            modes = [
+                ('plain', {'Accept-Encoding': 'identity'}),
+                ('compressed', compressed),
+                ('revalidated', {**compressed, 'If-None-Match': etag or ''}),
+            ]
+            for mode, headers in modes:
+                status, size, p50, p95 = measure(client, path, headers, repeat)
+                print(f"{path:<38}{mode:<13}{status:>7}{size:>10.0f}{p50:>9.2f}{p95:>9.2f}")
+
+
+def main(n_cases, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded_engine(os.path.join(tmp, 'fedex_dca.db'), n_cases).dispose()
+        print(f"seeded {n_cases} cases")
+        # The app opens ./fedex_dca.db, so serve from the seeded directory
+        with running_server(__file__, tmp) as base_url:
+            run(base_url, repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+    else:
+        main(args.cases, args.repeat)
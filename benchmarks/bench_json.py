@@ -0,0 +1,88 @@
+"""Benchmark: pydantic response_model vs the FAST_JSON column-tuple path.
+
+Seeds a SQLite database and starts the API twice under uvicorn, once with
+FAST_JSON=0 and once with FAST_JSON=1, then times the same requests against
+each. The responses are also checked to decode to the same JSON.
+
+Requests send Accept-Encoding: identity so compression doesn't blur the
+encoding cost.
+
+Usage: python benchmarks/bench_json.py [--cases 100000] [--repeat 30]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from _common import running_server, seeded_engine
+
+ENDPOINTS = [
+    '/api/cases/?limit=100',
+    '/api/cases/?limit=1000',
+    '/api/cases/search?q=kalor&limit=200',
+    '/api/analytics/summary',
+]
+HEADERS = {'Accept-Encoding': 'identity'}
+
+
+def serve(port):
+    import uvicorn
+
+    from app.main import app
+
+    uvicorn.run(app, host='127.0.0.1', port=port, log_level='warning')
+
+
+def measure(client, path, repeat):
+    body = client.get(path, headers=HEADERS).json()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.get(path, headers=HEADERS).raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return body, statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def run(tmp, fast, repeat):
+    results = {}
+    with running_server(__file__, tmp, {'FAST_JSON': '1' if fast else '0'}) as base_url:
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            # Let the first SLA sweep finish so both runs see the same book
+            while client.get('/api/analytics/sla-sweeper').json()['last_run'] is None:
+                time.sleep(0.2)
+            for path in ENDPOINTS:
+                results[path] = measure(client, path, repeat)
+    return results
+
+
+def main(n_cases, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded_engine(os.path.join(tmp, 'fedex_dca.db'), n_cases).dispose()
+        print(f"seeded {n_cases} cases")
+        # The app opens ./fedex_dca.db, so serve from the seeded directory
+        model = run(tmp, False, repeat)
+        fast = run(tmp, True, repeat)
+
+    print(f"{'endpoint':<38}{'model p50':>11}{'fast p50':>10}{'model p95':>11}{'fast p95':>10}{'speedup':>9}  same")
+    for path in ENDPOINTS:
+        model_body, model_p50, model_p95 = model[path]
+        fast_body, fast_p50, fast_p95 = fast[path]
+        same = 'yes' if model_body == fast_body else 'NO'
+        print(f"{path:<38}{model_p50:>11.2f}{fast_p50:>10.2f}{model_p95:>11.2f}{fast_p95:>10.2f}"
+              f"{model_p50 / fast_p50:>8.1f}x  {same}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+    else:
+        main(args.cases, args.repeat)
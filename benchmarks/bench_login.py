@@ -0,0 +1,147 @@
+"""Load test: login throughput and what a login storm does to other routes.
+
+Seeds users, starts the API under uvicorn (one worker) and hammers a login
+endpoint while a probe keeps requesting /health, a sync route served from
+the request threadpool:
+
+    /bench/threadpool/token   the previous login, verifying bcrypt in the
+                              request threadpool; kept here for comparison
+    /api/token                verification on the dedicated hashing pool
+
+Probe latency shows whether logins starve the threadpool. With
+--stored-rounds different from --rounds, the first login per user upgrades
+its hash, counted under "rehashed".
+
+Usage: python benchmarks/bench_login.py [--users 200] [--concurrency 32] [--duration 10] [--rounds 12]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from _common import running_server, seeded_engine
+
+PASSWORD = 'bench-password'
+
+
+def build_app():
+    from fastapi import Depends, HTTPException
+    from fastapi.security import OAuth2PasswordRequestForm
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from starlette.concurrency import run_in_threadpool
+
+    from app.database import get_async_db
+    from app.main import app
+    from app.passwords import pwd_context
+    from app.routes.auth import get_user_by_email
+
+    @app.post('/bench/threadpool/token')
+    async def threadpool_login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+        user = await get_user_by_email(db, form_data.username)
+        if not user or not await run_in_threadpool(pwd_context.verify, form_data.password, user.hashed_password):
+            raise HTTPException(status_code=401)
+        return {'token_type': 'bearer'}
+
+    return app
+
+
+def serve(port):
+    import uvicorn
+
+    uvicorn.run(build_app(), host='127.0.0.1', port=port, log_level='warning')
+
+
+def email(i):
+    return f'user{i}@example.com'
+
+
+def seed(directory, n_users, rounds):
+    from passlib.hash import bcrypt
+    from sqlalchemy.orm import Session
+
+    from app.database import User
+
+    engine = seeded_engine(os.path.join(directory, 'fedex_dca.db'), 1000)
+    hashed = bcrypt.using(rounds=rounds).hash(PASSWORD)
+    with Session(engine) as db:
+        db.add_all(
+            User(email=email(i), full_name=f'User {i}', hashed_password=hashed) for i in range(n_users)
+        )
+        db.commit()
+    engine.dispose()
+
+
+def summarize(timings):
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+async def storm(client, path, n_users, concurrency, duration):
+    logins, probes = [], []
+    rejected = 0
+    deadline = time.perf_counter() + duration
+
+    async def login_worker(offset):
+        nonlocal rejected
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post(path, data={'username': email(i % n_users), 'password': PASSWORD})
+            if response.status_code == 503:
+                rejected += 1
+            else:
+                response.raise_for_status()
+                logins.append((time.perf_counter() - start) * 1000)
+            i += concurrency
+
+    async def probe():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            (await client.get('/health')).raise_for_status()
+            probes.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.05)
+
+    await asyncio.gather(probe(), *(login_worker(i) for i in range(concurrency)))
+    return len(logins) / duration, summarize(logins), summarize(probes), rejected
+
+
+async def run(base_url, n_users, concurrency, duration):
+    limits = httpx.Limits(max_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        print(f"{'login path':<12}{'logins/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+              f"{'probe p50':>11}{'probe p95':>11}{'503s':>7}")
+        for label, path in (('threadpool', '/bench/threadpool/token'), ('executor', '/api/token')):
+            rps, (p50, p95), (probe_p50, probe_p95), rejected = await storm(
+                client, path, n_users, concurrency, duration
+            )
+            print(f"{label:<12}{rps:>10.1f}{p50:>10.1f}{p95:>10.1f}"
+                  f"{probe_p50:>11.2f}{probe_p95:>11.2f}{rejected:>7}")
+        hashing = (await client.get('/api/auth/status')).json()['password_hashing']
+        print(f"hashing pool: {hashing}")
+
+
+def main(n_users, concurrency, duration, rounds, stored_rounds):
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(tmp, n_users, stored_rounds)
+        print(f"seeded {n_users} users at bcrypt cost {stored_rounds}, serving at cost {rounds}")
+        with running_server(__file__, tmp, env={'BCRYPT_ROUNDS': str(rounds)}) as base_url:
+            asyncio.run(run(base_url, n_users, concurrency, duration))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--stored-rounds', type=int, help='bcrypt cost of the seeded hashes (default: --rounds)')
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+    else:
+        main(args.users, args.concurrency, args.duration, args.rounds, args.stored_rounds or args.rounds)
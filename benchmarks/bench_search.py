@@ -0,0 +1,49 @@
+"""Benchmark: /api/cases/search latency on a large book.
+
+Seeds a SQLite database, builds the FTS index and times a mix of name,
+prefix and case-id queries through app.search.search_cases.
+
+Usage: python benchmarks/bench_search.py [--cases 1000000] [--repeat 50]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.orm import Session
+
+from _common import seeded_engine
+
+from app.search import install_search_index, search_cases
+
+QUERIES = ['Kalor Venmo', 'kalor ven', 'trip', 'Holdings', 'selda group', 'CASE-123456', 'case 99']
+
+
+def main(n_cases, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = seeded_engine(os.path.join(tmp, 'bench_search.db'), n_cases)
+        start = time.perf_counter()
+        install_search_index(engine)
+        print(f"indexed {n_cases} cases in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'query':<16}{'hits':>6}{'p50 ms':>10}{'p95 ms':>10}")
+        with Session(engine) as db:
+            for q in QUERIES:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    hits = search_cases(db, q, limit=20)
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                print(f"{q:<16}{len(hits):>6}{statistics.median(timings):>10.2f}{p95:>10.2f}")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    main(args.cases, args.repeat)
@@ -0,0 +1,57 @@
+"""Microbenchmark: compiled tree arrays vs sklearn predict.
+
+Times scoring for both models through sklearn and through the published
+bundle's memory-mapped arrays (backend/app/model_bundle.py), from single
+rows to batches larger than tree_eval.CHUNK_ROWS. Run ml/train_*.py and
+ml/export_trees.py first.
+
+Usage: python benchmarks/bench_tree_eval.py [--repeat 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'ml'))
+
+from app.model_bundle import ModelBundle, manifest_filename
+from export_trees import MODEL_DIR, sample_features
+
+
+def time_call(fn, X, repeat):
+    fn(X)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(repeat):
+    print(f"{'model':<10}{'rows':>6}{'sklearn us':>14}{'compiled us':>14}{'speedup':>10}")
+    for name in ['priority', 'recovery']:
+        model = joblib.load(os.path.join(MODEL_DIR, f'{name}_model.pkl'))
+        scaler = joblib.load(os.path.join(MODEL_DIR, f'{name}_scaler.pkl'))
+        compiled = ModelBundle.open(os.path.join(MODEL_DIR, manifest_filename(name))).ensemble
+
+        if compiled.kind == 'classifier':
+            sklearn_fn = lambda X: model.predict_proba((X - scaler.mean_) / scaler.scale_)
+            compiled_fn = compiled.predict_proba
+        else:
+            sklearn_fn = lambda X: model.predict((X - scaler.mean_) / scaler.scale_)
+            compiled_fn = compiled.predict
+
+        for rows in [1, 8, 64, 256, 1024, 10000]:
+            X = sample_features(model.n_features_in_, rows)
+            n = max(repeat // rows, 20)
+            sklearn_us = time_call(sklearn_fn, X, n)
+            compiled_us = time_call(compiled_fn, X, n)
+            print(f"{name:<10}{rows:>6}{sklearn_us:>14.1f}{compiled_us:>14.1f}{sklearn_us / compiled_us:>9.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000)
+    main(parser.parse_args().repeat)
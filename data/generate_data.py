@@ -0,0 +1,342 @@
+"""Generate a large synthetic case book for load testing.
+
+Every column of a chunk is drawn with NumPy in one call, then the chunk is
+inserted with a single executemany and committed, so memory stays flat. The
+search triggers and the non-unique case and SLA indexes are dropped for the
+load and rebuilt once at the end, as is the analytics rollup. On SQLite
+1M cases (plus ~700k SLAs) take about a minute: ~25s of inserts at
+40-50k rows/s, ~30s rebuilding the indexes and search index and ~8s for
+the rollup. Writing only a CSV takes ~5s. If a run is killed mid-load,
+`python -m app.search rebuild` restores the search index; the app
+re-creates missing indexes at startup.
+
+Ids come from the case id sequence, so generated cases can be added next
+to existing ones; --reset clears the case, SLA and DCA tables first, as
+seed_data.py does.
+
+Distributions take a name and parameters:
+
+    --amount   exponential:SCALE | lognormal:MEAN,SIGMA | uniform:LOW,HIGH
+    --overdue  uniform:LOW,HIGH | exponential:SCALE | poisson:LAM  (days, 0-365)
+    --status   open=0.4,in_progress=0.3,resolved=0.2,closed=0.1
+    --dca      "DCA Alpha=0.35,DCA Beta=0.3,DCA Gamma=0.25,=0.1"  (empty name: unassigned)
+
+Priority and recovery probability follow the same business rules as
+seed_data.py. --sla-fraction of the open and in-progress cases get an SLA
+row with the deadline and flags the SLA sweeper would set. --users adds
+login users that all share one password hash (--user-password). The same
+--seed always gives the same book.
+
+--csv / --parquet also write the cases in the bulk-ingest column layout
+(`python -m app.ingest`, POST /api/cases/bulk); Parquet needs pyarrow.
+--no-db only writes the files. The database is the app's (DATABASE_URL).
+
+Usage: python generate_data.py --cases 1000000 [--seed 42] [--csv cases.csv] [--reset]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import delete, select
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import rollup
+from app.ageing import SLA_BREACH_DAYS, SLA_CRITICAL_DAYS
+from app.case_ids import reserve_case_ids
+from app.database import SLA, Case, DCA, SessionLocal, User, engine, init_db
+from app.ingest import CASE_COLUMNS
+from app.search import drop_search_triggers, install_search_index, rebuild_search_index
+
+CHUNK_ROWS = 100_000
+MAX_OVERDUE_DAYS = 365
+
+# Maintaining these row by row dominates the load; they are rebuilt once at the end
+DEFERRED_INDEXES = [index for table in (Case.__table__, SLA.__table__) for index in table.indexes if not index.unique]
+
+DEFAULT_DCAS = {
+    'DCA Alpha': dict(performance_score=0.85, active_cases=89, recovery_rate=78, avg_resolution_days=38),
+    'DCA Beta': dict(performance_score=0.78, active_cases=76, recovery_rate=72, avg_resolution_days=42),
+    'DCA Gamma': dict(performance_score=0.70, active_cases=82, recovery_rate=65, avg_resolution_days=56),
+}
+# Agencies named in --dca that don't exist yet get middling stats
+NEW_DCA = dict(performance_score=0.75, active_cases=80, recovery_rate=70, avg_resolution_days=45)
+
+_SYLLABLES = ['ka', 'lor', 'ven', 'tri', 'mo', 'sel', 'dan', 'qu', 'rix', 'pa', 'nor', 'est', 'gal', 'tu', 'bre']
+WORDS = np.array([(a + b).capitalize() for a in _SYLLABLES for b in _SYLLABLES if a != b])
+SUFFIXES = np.array(['Inc', 'Ltd', 'Corporation', 'Group', 'Logistics', 'Holdings', 'Partners', 'Systems'])
+
+
+def parse_distribution(spec):
+    name, _, params = spec.partition(':')
+    values = [float(p) for p in params.split(',') if p]
+    expected = {'exponential': 1, 'lognormal': 2, 'uniform': 2, 'poisson': 1}
+    if expected.get(name) != len(values):
+        raise argparse.ArgumentTypeError(f'expected one of {sorted(expected)} with its parameters, got {spec!r}')
+    return name, values
+
+
+def parse_weights(spec):
+    names, weights = [], []
+    for part in spec.split(','):
+        name, _, weight = part.rpartition('=')
+        names.append(name.strip())
+        weights.append(float(weight))
+    weights = np.array(weights)
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise argparse.ArgumentTypeError(f'weights must be non-negative and not all zero: {spec!r}')
+    return np.array(names, dtype=object), weights / weights.sum()
+
+
+def draw(rng, distribution, size):
+    name, p = distribution
+    if name == 'exponential':
+        return rng.exponential(p[0], size)
+    if name == 'lognormal':
+        return rng.lognormal(p[0], p[1], size)
+    if name == 'uniform':
+        return rng.uniform(p[0], p[1], size)
+    return rng.poisson(p[0], size).astype(float)
+
+
+def priority_rules(amount, overdue_days):
+    return np.select(
+        [(amount > 50000) | (overdue_days > 90), (amount > 20000) | (overdue_days > 60)],
+        ['High', 'Medium'],
+        default='Low',
+    ).astype(object)
+
+
+def recovery_rules(rng, amount, overdue_days):
+    probability = 0.8 - np.select([overdue_days > 90, overdue_days > 60], [0.3, 0.15], default=0.0)
+    probability -= np.where(amount > 100000, 0.1, 0.0)
+    probability += rng.uniform(-0.1, 0.1, len(amount))
+    return np.round(np.clip(probability, 0.1, 0.95), 2)
+
+
+def generate_chunk(rng, n, args, now):
+    """Columns for n cases, as Python lists ready for executemany"""
+    amount = np.round(np.maximum(draw(rng, args.amount, n), 1.0), 2)
+    overdue_days = np.clip(np.rint(draw(rng, args.overdue, n)), 0, MAX_OVERDUE_DAYS).astype(int)
+    status_names, status_weights = args.status
+    dca_names, dca_weights = args.dca
+    names = (
+        WORDS[rng.integers(0, len(WORDS), n)].astype(object) + ' '
+        + WORDS[rng.integers(0, len(WORDS), n)].astype(object) + ' '
+        + SUFFIXES[rng.integers(0, len(SUFFIXES), n)].astype(object)
+    )
+    dca = dca_names[rng.choice(len(dca_names), n, p=dca_weights)]
+    created_at = (
+        np.datetime64(now, 'us')
+        - overdue_days.astype('timedelta64[D]')
+        - rng.integers(0, 86_400_000_000, n).astype('timedelta64[us]')
+    )
+    return {
+        'customer_name': names.tolist(),
+        'amount': amount.tolist(),
+        'overdue_days': overdue_days.tolist(),
+        'status': status_names[rng.choice(len(status_names), n, p=status_weights)].tolist(),
+        'priority': priority_rules(amount, overdue_days).tolist(),
+        'dca_assigned': [name or None for name in dca.tolist()],
+        'recovery_probability': recovery_rules(rng, amount, overdue_days).tolist(),
+        'created_at': created_at.tolist(),
+    }
+
+
+def sla_rows(rng, case_ids, columns, fraction, now):
+    """SLA rows for a random `fraction` of the active cases, flagged as of now"""
+    status = np.array(columns['status'], dtype=object)
+    active = np.flatnonzero(np.isin(status, ['open', 'in_progress']))
+    chosen = active[rng.random(len(active)) < fraction]
+    overdue_days = np.array(columns['overdue_days'])[chosen]
+    # Same deadline as sla.sla_deadline(): breached once past SLA_BREACH_DAYS
+    today = np.datetime64(now.date(), 'us')
+    deadline = today - overdue_days.astype('timedelta64[D]') + np.timedelta64(SLA_BREACH_DAYS + 1, 'D')
+    breached = deadline <= np.datetime64(now, 'us')
+    critical = deadline + np.timedelta64(SLA_CRITICAL_DAYS - SLA_BREACH_DAYS, 'D') <= np.datetime64(now, 'us')
+    ids = np.array(case_ids, dtype=object)[chosen]
+    return list(zip(ids.tolist(), deadline.tolist(), breached.tolist(), critical.tolist()))
+
+
+def _insert_sql(conn, table, columns):
+    placeholder = {'qmark': '?', 'numeric': None, 'named': None}.get(conn.dialect.paramstyle, '%s')
+    if placeholder is None:
+        raise SystemExit(f'unsupported driver paramstyle {conn.dialect.paramstyle!r}')
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+
+
+class Outputs:
+    """CSV / Parquet writers in the bulk-ingest column layout"""
+
+    def __init__(self, csv_path, parquet_path):
+        self._csv_file = self._csv = self._parquet = None
+        if csv_path:
+            self._csv_file = open(csv_path, 'w', newline='')
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(CASE_COLUMNS)
+        if parquet_path:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit('--parquet needs pyarrow (pip install pyarrow)')
+            self._pa = pa
+            schema = pa.schema([
+                ('customer_name', pa.string()), ('amount', pa.float64()), ('overdue_days', pa.int64()),
+                ('status', pa.string()), ('priority', pa.string()), ('dca_assigned', pa.string()),
+                ('recovery_probability', pa.float64()),
+            ])
+            self._parquet = pq.ParquetWriter(parquet_path, schema)
+
+    def write(self, columns):
+        if self._csv:
+            self._csv.writerows(zip(*(columns[c] for c in CASE_COLUMNS)))
+        if self._parquet:
+            table = self._pa.table({c: columns[c] for c in CASE_COLUMNS}, schema=self._parquet.schema)
+            self._parquet.write_table(table)
+
+    def close(self):
+        if self._csv_file:
+            self._csv_file.close()
+        if self._parquet:
+            self._parquet.close()
+
+
+def ensure_dcas(db, dca_names):
+    existing = set(db.execute(select(DCA.name)).scalars())
+    for name in dca_names:
+        if name and name not in existing:
+            db.add(DCA(name=name, **DEFAULT_DCAS.get(name, NEW_DCA)))
+    db.commit()
+
+
+def add_users(db, n_users, password):
+    from app.passwords import hash_password
+
+    existing = set(db.execute(select(User.email).where(User.email.like('loadtest%'))).scalars())
+    # bcrypt is slow on purpose; hash once and share it
+    hashed = asyncio.run(hash_password(password))
+    now = datetime.utcnow()
+    emails = [f'loadtest{i}@example.com' for i in range(n_users)]
+    rows = [(email, f'Load Test {i}', hashed, 'agent', now) for i, email in enumerate(emails) if email not in existing]
+    if rows:
+        conn = db.connection()
+        conn.exec_driver_sql(
+            _insert_sql(conn, 'users', ['email', 'full_name', 'hashed_password', 'role', 'created_at']), rows
+        )
+    db.commit()
+    return len(rows)
+
+
+def drop_indexes():
+    """Drop the search triggers and the non-unique case and SLA indexes for the load"""
+    drop_search_triggers(engine)
+    for index in DEFERRED_INDEXES:
+        index.drop(bind=engine, checkfirst=True)
+
+
+def restore_indexes():
+    """Rebuild the indexes and the search index once, over every loaded row"""
+    for index in DEFERRED_INDEXES:
+        index.create(bind=engine, checkfirst=True)
+    install_search_index(engine)
+    rebuild_search_index(engine)
+
+
+def generate(args):
+    rng = np.random.default_rng(args.seed)
+    now = datetime.utcnow()
+    outputs = Outputs(args.csv, args.parquet)
+    db = None
+    if not args.no_db:
+        init_db()
+        install_search_index(engine)
+        db = SessionLocal()
+
+    case_columns = ('id',) + CASE_COLUMNS + ('created_at', 'updated_at', 'overdue_as_of')
+    started = time.perf_counter()
+    generated = slas = 0
+    summary = {'cases': 0, 'slas': 0, 'users': 0}
+    try:
+        try:
+            if db is not None:
+                print('Dropping indexes for the load...')
+                drop_indexes()
+                if args.reset:
+                    for table in (SLA, Case, DCA):
+                        db.execute(delete(table))
+                    db.commit()
+                ensure_dcas(db, args.dca[0])
+
+            for start in range(0, args.cases, args.chunk_rows):
+                n = min(args.chunk_rows, args.cases - start)
+                columns = generate_chunk(rng, n, args, now)
+                outputs.write(columns)
+                if db is not None:
+                    case_ids = reserve_case_ids(db, n)
+                    conn = db.connection()
+                    conn.exec_driver_sql(_insert_sql(conn, 'cases', case_columns), list(zip(
+                        case_ids, *(columns[c] for c in CASE_COLUMNS),
+                        columns['created_at'], columns['created_at'], [now.date()] * n,
+                    )))
+                    rows = sla_rows(rng, case_ids, columns, args.sla_fraction, now)
+                    if rows:
+                        conn.exec_driver_sql(
+                            _insert_sql(conn, 'slas', ['case_id', 'sla_deadline', 'is_breached', 'is_critical']), rows
+                        )
+                    slas += len(rows)
+                    db.commit()
+                generated += n
+                elapsed = time.perf_counter() - started
+                print(f'{generated} cases ({generated / elapsed:.0f}/s)', flush=True)
+        finally:
+            outputs.close()
+            if db is not None:
+                db.rollback()
+                print('Rebuilding indexes...')
+                restore_indexes()
+                # Bring the rollup and data version in line with every committed
+                # chunk, even if a later chunk failed
+                if generated:
+                    print('Rebuilding analytics rollup...')
+                    rollup.rebuild(db)
+
+        summary.update(cases=generated, slas=slas)
+        if db is not None and args.users:
+            summary['users'] = add_users(db, args.users, args.user_password)
+    finally:
+        if db is not None:
+            db.close()
+
+    summary['seconds'] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--amount', type=parse_distribution, default='exponential:30000')
+    parser.add_argument('--overdue', type=parse_distribution, default='uniform:0,180')
+    parser.add_argument('--status', type=parse_weights, default='open=0.4,in_progress=0.3,resolved=0.2,closed=0.1')
+    parser.add_argument('--dca', type=parse_weights, default='DCA Alpha=0.35,DCA Beta=0.3,DCA Gamma=0.25,=0.1')
+    parser.add_argument('--sla-fraction', type=float, default=1.0, help='share of active cases given an SLA row')
+    parser.add_argument('--users', type=int, default=0)
+    parser.add_argument('--user-password', default='loadtest')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--reset', action='store_true', help='delete existing cases, SLAs and DCAs first')
+    parser.add_argument('--csv', help='also write the cases to this CSV file')
+    parser.add_argument('--parquet', help='also write the cases to this Parquet file')
+    parser.add_argument('--no-db', action='store_true', help='only write the --csv / --parquet files')
+    args = parser.parse_args()
+    if args.no_db and not (args.csv or args.parquet):
+        parser.error('--no-db needs --csv or --parquet')
+
+    result = generate(args)
+    print(f"\n✓ Generated {result['cases']} cases, {result['slas']} SLAs and "
+          f"{result['users']} users in {result['seconds']}s")
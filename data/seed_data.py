@@ -3,6 +3,7 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
 from app.database import SessionLocal, init_db, Case, DCA, SLA
+from app import rollup
 from datetime import datetime, timedelta
 import random
 
@@ -119,6 +120,9 @@ def seed_database():
         
         db.commit()
         
+        print("Rebuilding analytics rollup...")
+        rollup.rebuild(db)
+        
         print(f"\n✓ Database seeded successfully!")
         print(f"  - {len(dcas)} DCAs created")
         print(f"  - {len(cases)} cases created")
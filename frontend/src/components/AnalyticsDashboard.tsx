@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
 import { TrendingUp, TrendingDown, AlertTriangle, CheckCircle, DollarSign } from 'lucide-react';
+import { subscribeToEvents, KpiDelta } from '@/lib/events';
 
 interface AnalyticsData {
     ageingBuckets: { label: string; count: number; amount: number }[];
@@ -13,6 +14,8 @@ interface AnalyticsData {
         totalAmount: number;
         avgRecoveryRate: number;
         avgResolutionDays: number;
+        recoverySum?: number;
+        recoveryCount?: number;
     };
 }
 
@@ -21,6 +24,11 @@ const AnalyticsDashboard: React.FC = () => {
 
     useEffect(() => {
         fetchAnalytics();
+        // Patch totals from live case events instead of re-fetching the summary
+        return subscribeToEvents({
+            onCase: (event) => setAnalytics(prev => applyKpiDelta(prev, event.kpi_delta)),
+            onResync: fetchAnalytics,
+        });
     }, []);
 
     const fetchAnalytics = async () => {
@@ -238,6 +246,28 @@ const AnalyticsDashboard: React.FC = () => {
     );
 };
 
+const applyKpiDelta = (analytics: AnalyticsData, deltas: KpiDelta[]): AnalyticsData => {
+    const kpis = { ...analytics.kpis };
+    let ageingBuckets = analytics.ageingBuckets;
+    for (const delta of deltas) {
+        if (delta.dimension === 'total') {
+            kpis.totalCases += delta.count;
+            kpis.totalAmount += delta.amount;
+            if (kpis.recoverySum !== undefined && kpis.recoveryCount !== undefined) {
+                kpis.recoverySum += delta.recovery_sum;
+                kpis.recoveryCount += delta.recovery_count;
+                kpis.avgRecoveryRate = kpis.recoveryCount > 0 ? Math.round((kpis.recoverySum / kpis.recoveryCount) * 100) : 0;
+            }
+        } else if (delta.dimension === 'bucket') {
+            ageingBuckets = ageingBuckets.map(b =>
+                b.label === delta.key ? { ...b, count: b.count + delta.count, amount: b.amount + delta.amount } : b
+            );
+        }
+    }
+    // SLA breaches come from the sweeper's flags; a resync re-fetches them
+    return { ...analytics, kpis, ageingBuckets };
+};
+
 // Mock analytics data
 const mockAnalytics: AnalyticsData = {
     kpis: {
@@ -1,9 +1,10 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
 import { Button } from '@/components/ui/button';
 import { Search, ArrowUpDown, Eye } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
+import { subscribeToEvents } from '@/lib/events';
 
 interface Case {
     id: string;
@@ -17,51 +18,111 @@ interface Case {
     createdAt: string;
 }
 
+const API_URL = 'http://localhost:8000/api/cases';
+const PAGE_SIZE = 50;
+
+// The API returns snake_case fields
+const toCase = (c: any): Case => ({
+    id: c.id,
+    customerName: c.customer_name ?? c.customerName,
+    amount: c.amount,
+    overdueDays: c.overdue_days ?? c.overdueDays,
+    status: c.status,
+    priority: c.priority,
+    dcaAssigned: c.dca_assigned ?? c.dcaAssigned ?? '',
+    recoveryProbability: c.recovery_probability ?? c.recoveryProbability ?? 0,
+    createdAt: c.created_at ?? c.createdAt,
+});
+
 const CaseManagement: React.FC = () => {
     const navigate = useNavigate();
     const [cases, setCases] = useState<Case[]>([]);
     const [searchTerm, setSearchTerm] = useState('');
     const [filterPriority, setFilterPriority] = useState('all');
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
 
     const [isLoading, setIsLoading] = useState(true);
 
     useEffect(() => {
-        // Fetch cases from API
-        fetchCases();
+        // Fetch cases from API; filtering and search happen server-side
+        if (!searchTerm.trim()) {
+            fetchCases();
+            return;
+        }
+        const timer = setTimeout(() => searchCases(searchTerm.trim()), 250);
+        return () => clearTimeout(timer);
+    }, [filterPriority, searchTerm]);
+
+    useEffect(() => {
+        // One subscription for the page's lifetime; handlers read the current
+        // search and filters through latest. A resync reloads the first page
+        return subscribeToEvents({
+            onCase: (event) => {
+                const updated = toCase(event.case);
+                setCases(prev => prev.map(c => (c.id === updated.id ? updated : c)));
+            },
+            onResync: () => {
+                if (!latest.current.searchTerm.trim()) latest.current.fetchCases();
+            },
+        });
     }, []);
 
-    const fetchCases = async () => {
-        setIsLoading(true);
+    const searchCases = async (query: string) => {
+        try {
+            const params = new URLSearchParams({ q: query, limit: '100' });
+            const response = await fetch(`${API_URL}/search?${params}`);
+            if (response.ok) {
+                const data = await response.json();
+                setCases(data.map(toCase));
+                setNextCursor(null);
+            }
+        } catch (error) {
+            console.warn('Search failed:', error);
+        }
+    };
+
+    const fetchCases = async (cursor?: string) => {
+        setIsLoading(!cursor);
         try {
+            const params = new URLSearchParams({ limit: String(PAGE_SIZE), sort: 'overdue_days', order: 'desc' });
+            if (filterPriority !== 'all') {
+                params.set('priority', filterPriority.charAt(0).toUpperCase() + filterPriority.slice(1));
+            }
+            if (cursor) {
+                params.set('cursor', cursor);
+            }
+
             // Attempt to fetch from backend
-            const response = await fetch('http://localhost:8000/api/cases');
+            const response = await fetch(`${API_URL}?${params}`);
             if (!response.ok) {
                 console.warn('Backend not reachable or returned error, falling back to mock data');
                 setCases(mockCases);
+                setNextCursor(null);
             } else {
                 const data = await response.json();
                 if (Array.isArray(data)) {
-                    setCases(data);
+                    const page = data.map(toCase);
+                    setCases(prev => (cursor ? [...prev, ...page] : page));
+                    setNextCursor(response.headers.get('X-Next-Cursor'));
                 } else {
                     setCases(mockCases);
+                    setNextCursor(null);
                 }
             }
         } catch (error) {
             console.warn('Network error, falling back to mock data:', error);
             setCases(mockCases);
+            setNextCursor(null);
         } finally {
             setIsLoading(false);
         }
     };
 
+    const latest = useRef({ searchTerm, fetchCases });
+    latest.current = { searchTerm, fetchCases };
 
-
-    const filteredCases = cases.filter(c => {
-        const matchesSearch = (c.customerName || '').toLowerCase().includes(searchTerm.toLowerCase()) ||
-            (c.id || '').toLowerCase().includes(searchTerm.toLowerCase());
-        const matchesPriority = filterPriority === 'all' || (c.priority || '').toLowerCase() === filterPriority;
-        return matchesSearch && matchesPriority;
-    });
+    // Search results are ranked server-side and don't take the priority filter
+    const isSearching = searchTerm.trim() !== '';
 
     return (
         <div className="space-y-6 animate-in fade-in zoom-in duration-500">
@@ -96,7 +157,9 @@ const CaseManagement: React.FC = () => {
                             <select
                                 value={filterPriority}
                                 onChange={(e) => setFilterPriority(e.target.value)}
-                                className="px-4 py-2 border border-gray-200 dark:border-white/10 rounded-xl focus:ring-2 focus:ring-purple-600 focus:border-transparent bg-white/50 dark:bg-white/5 transition-all text-sm"
+                                disabled={isSearching}
+                                title={isSearching ? 'Clear the search to filter by priority' : undefined}
+                                className="px-4 py-2 border border-gray-200 dark:border-white/10 rounded-xl focus:ring-2 focus:ring-purple-600 focus:border-transparent bg-white/50 dark:bg-white/5 transition-all text-sm disabled:opacity-50"
                             >
                                 <option value="all">All Priorities</option>
                                 <option value="high">High</option>
@@ -114,7 +177,7 @@ const CaseManagement: React.FC = () => {
             {/* Cases Table */}
             <Card className="border-white/20 bg-white/50 dark:bg-black/40 backdrop-blur-md shadow-xl overflow-hidden">
                 <CardHeader>
-                    <CardTitle>Active Cases ({filteredCases.length})</CardTitle>
+                    <CardTitle>Active Cases ({cases.length})</CardTitle>
                     <CardDescription>Overview of all debt collection cases</CardDescription>
                 </CardHeader>
                 <CardContent>
@@ -139,7 +202,7 @@ const CaseManagement: React.FC = () => {
                                     </tr>
                                 </thead>
                                 <tbody className="divide-y divide-gray-100 dark:divide-white/5">
-                                    {filteredCases.map((caseItem) => (
+                                    {cases.map((caseItem) => (
                                         <tr
                                             key={caseItem.id}
                                             className="group hover:bg-purple-50/50 dark:hover:bg-purple-900/10 transition-all duration-200"
@@ -184,6 +247,17 @@ const CaseManagement: React.FC = () => {
                                     ))}
                                 </tbody>
                             </table>
+                            {nextCursor && (
+                                <div className="flex justify-center pt-6">
+                                    <Button
+                                        variant="outline"
+                                        className="rounded-xl border-gray-200 dark:border-white/10 hover:bg-purple-50 dark:hover:bg-purple-900/20"
+                                        onClick={() => fetchCases(nextCursor)}
+                                    >
+                                        Load more
+                                    </Button>
+                                </div>
+                            )}
                         </div>
                     )}
                 </CardContent>
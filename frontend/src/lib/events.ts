@@ -0,0 +1,31 @@
+const EVENTS_URL = 'http://localhost:8000/api/events';
+
+export interface KpiDelta {
+    dimension: string;
+    key: string;
+    count: number;
+    amount: number;
+    recovery_sum: number;
+    recovery_count: number;
+}
+
+export interface CaseEvent {
+    action: 'created' | 'updated' | 'allocated';
+    case: any;
+    kpi_delta: KpiDelta[];
+}
+
+interface Handlers {
+    onCase?: (event: CaseEvent) => void;
+    // Sent after bulk writes, reconnects and when this client fell behind:
+    // re-fetch full state
+    onResync?: () => void;
+}
+
+// Subscribe to live case updates; returns a function that closes the stream
+export function subscribeToEvents({ onCase, onResync }: Handlers): () => void {
+    const source = new EventSource(EVENTS_URL);
+    source.addEventListener('case', (e) => onCase?.(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener('resync', () => onResync?.());
+    return () => source.close();
+}
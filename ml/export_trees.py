@@ -0,0 +1,162 @@
+"""Compile the trained models into bundles the backend serves from.
+
+Reads models/{priority,recovery}_model.pkl and their scalers, flattens each
+into NumPy node arrays for the backend's array-based evaluator
+(backend/app/tree_eval.py) and publishes them as a versioned bundle,
+models/<name>_bundle.json plus models/bundles/<name>/<version>/ (see
+backend/app/model_bundle.py). The training metadata written by train_*.py
+is carried in the manifest. Every export is checked for parity against
+sklearn before it is written.
+
+Usage: python export_trees.py [--samples 5000]
+"""
+import argparse
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.model_bundle import ModelBundle, write_bundle
+from app.model_registry import file_sha1
+from app.scoring import FEATURES
+from app.tree_eval import CompiledEnsemble
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MODELS = ['priority', 'recovery']
+# Recovery's fifth feature; see DEFAULT_DCA_PERFORMANCE in backend/app/scoring.py
+EXTRA_FEATURES = ['dca_performance']
+
+
+def flatten_ensemble(model, scaler):
+    """Concatenate every tree's nodes into one set of arrays"""
+    is_classifier = hasattr(model, 'classes_')
+    trees = [est.tree_ for est in np.ravel(model.estimators_)]
+
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        own_index = np.arange(offset, offset + n)
+
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, 0.0, tree.threshold))
+        # Leaves loop back to themselves so extra levels are no-ops
+        left.append(np.where(is_leaf, own_index, tree.children_left + offset))
+        right.append(np.where(is_leaf, own_index, tree.children_right + offset))
+
+        if is_classifier:
+            counts = tree.value[:, 0, :]
+            totals = counts.sum(axis=1, keepdims=True)
+            value.append(counts / np.where(totals == 0, 1, totals))
+        else:
+            value.append(tree.value[:, 0, :1] * model.learning_rate)
+
+        roots.append(offset)
+        offset += n
+
+    n_features = model.n_features_in_
+    if is_classifier:
+        baseline = 0.0
+    elif isinstance(model.init_, str):  # init='zero'
+        baseline = 0.0
+    else:
+        baseline = float(model.init_.predict(np.zeros((1, n_features)))[0])
+
+    return {
+        'kind': np.array('classifier' if is_classifier else 'regressor'),
+        'feature': np.concatenate(feature).astype(np.intp),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'left': np.concatenate(left).astype(np.intp),
+        'right': np.concatenate(right).astype(np.intp),
+        'value': np.concatenate(value).astype(np.float64),
+        'roots': np.array(roots, dtype=np.intp),
+        'depth': np.array(max(t.max_depth for t in trees)),
+        'baseline': np.array(baseline),
+        'classes': np.asarray(model.classes_, dtype=str) if is_classifier else np.array([], dtype=str),
+        'n_features': np.array(n_features),
+        'scaler_mean': np.asarray(scaler.mean_, dtype=np.float64) if scaler is not None else np.zeros(n_features),
+        'scaler_scale': np.asarray(scaler.scale_, dtype=np.float64) if scaler is not None else np.ones(n_features),
+    }
+
+
+def sample_features(n_features, n_samples, seed=0):
+    """Draw rows from the same distributions the models were trained on"""
+    rng = np.random.default_rng(seed)
+    columns = [
+        rng.exponential(scale=30000, size=n_samples),
+        rng.integers(1, 150, size=n_samples),
+        rng.choice([0, 1], size=n_samples, p=[0.7, 0.3]),
+        rng.poisson(lam=0.5, size=n_samples),
+        rng.uniform(0.6, 0.9, size=n_samples),
+    ]
+    return np.column_stack(columns[:n_features]).astype(float)
+
+
+def check_parity(model, scaler, compiled, X):
+    """Raise if the compiled ensemble disagrees with sklearn on X"""
+    # Same arithmetic as StandardScaler.transform, minus the feature-name warning
+    X_scaled = (X - scaler.mean_) / scaler.scale_ if scaler is not None else X
+    if compiled.kind == 'classifier':
+        expected = model.predict_proba(X_scaled)
+        actual = compiled.predict_proba(X)
+        if not np.array_equal(model.predict(X_scaled), compiled.predict(X)):
+            raise AssertionError('compiled classifier predicts different labels than sklearn')
+    else:
+        expected = model.predict(X_scaled)
+        actual = compiled.predict(X)
+    max_error = float(np.max(np.abs(expected - actual)))
+    if not np.allclose(expected, actual, rtol=1e-9, atol=1e-9):
+        raise AssertionError(f'compiled ensemble differs from sklearn (max abs error {max_error:.3g})')
+    return max_error
+
+
+def training_metadata(name, model_sha1):
+    """The metadata train_*.py published with this pickle, if it is the same one"""
+    path = os.path.join(MODEL_DIR, f'{name}_model.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        metadata = json.load(f)
+    return metadata if metadata.get('model_sha1') == model_sha1 else None
+
+
+def export(name, n_samples):
+    model_path = os.path.join(MODEL_DIR, f'{name}_model.pkl')
+    scaler_path = os.path.join(MODEL_DIR, f'{name}_scaler.pkl')
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path) if os.path.exists(scaler_path) else None
+
+    arrays = flatten_ensemble(model, scaler)
+    model_sha1 = file_sha1(model_path)
+    arrays['source_sha1'] = np.array(model_sha1)
+    compiled = CompiledEnsemble(arrays)
+
+    X = sample_features(model.n_features_in_, n_samples)
+    max_error = check_parity(model, scaler, compiled, X)
+    # Single rows go through the same code path, but check them explicitly
+    for row in X[:50]:
+        check_parity(model, scaler, compiled, row[None, :])
+
+    training = training_metadata(name, model_sha1)
+    features = training['features'] if training else (FEATURES + EXTRA_FEATURES)[:model.n_features_in_]
+    out_path = write_bundle(MODEL_DIR, name, arrays, features, training)
+    # And once more as the API will see it, through the memory-mapped files
+    check_parity(model, scaler, ModelBundle.open(out_path).ensemble, X)
+
+    print(f"{name}: {len(arrays['roots'])} trees, {len(arrays['feature'])} nodes, "
+          f"depth {int(arrays['depth'])}, max abs error vs sklearn {max_error:.2e}")
+    print(f"  saved to {out_path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=5000, help='rows used for the sklearn parity check')
+    args = parser.parse_args()
+
+    for name in MODELS:
+        export(name, args.samples)
@@ -0,0 +1,239 @@
+"""Shared training pipeline for the priority and recovery models.
+
+Training rows come either from the synthetic generator (the default, so a
+fresh checkout can train before any data exists) or straight from the
+`cases` table, streamed in chunks through a server-side cursor. Features and
+rule-based labels are built with whole-column NumPy operations.
+
+Cross-validation folds run in parallel (--jobs), and the forest fits its
+trees in parallel. Folds are scored on a sample of at most --cv-rows rows, so
+a run over millions of cases stays in the minutes.
+
+Each run writes a versioned directory
+
+    models/versions/<name>/<version>/{model.pkl, scaler.pkl, metadata.json}
+
+then publishes it as models/<name>_model.pkl, <name>_scaler.pkl and
+<name>_model.json, which the backend's model registry picks up on its next
+check. metadata.json records the feature order, row counts, parameters,
+metrics and per-stage timings.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import cross_validate, train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy import create_engine, func, select
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.database import Case, DCA
+from app.model_registry import file_sha1
+from app.scoring import DEFAULT_DCA_PERFORMANCE
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'fedex_dca.db'
+)
+CHUNK_ROWS = 100_000
+
+
+def synthetic_cases(n_rows, seed):
+    """Feature columns drawn from the distributions the models were built on"""
+    rng = np.random.default_rng(seed)
+    return {
+        'amount': rng.exponential(scale=30000, size=n_rows),
+        'overdue_days': rng.integers(1, 150, size=n_rows).astype(float),
+        'customer_segment': rng.choice([0.0, 1.0], size=n_rows, p=[0.7, 0.3]),
+        'previous_defaults': rng.poisson(lam=0.5, size=n_rows).astype(float),
+        'dca_performance': rng.uniform(0.6, 0.9, size=n_rows),
+    }
+
+
+def load_cases(database_url, chunk_rows=CHUNK_ROWS):
+    """Read the model columns of every case, chunk by chunk.
+
+    Segment and previous defaults are not stored on cases, so they are zero
+    (standard customer, no defaults). Unassigned cases get the average DCA
+    performance the backend scores them with.
+    """
+    query = (
+        select(
+            Case.amount,
+            Case.overdue_days,
+            func.coalesce(DCA.performance_score, DEFAULT_DCA_PERFORMANCE),
+            Case.priority,
+            Case.recovery_probability,
+        )
+        .outerjoin(DCA, DCA.name == Case.dca_assigned)
+        .where(Case.amount.isnot(None), Case.overdue_days.isnot(None))
+    )
+    chunks = {name: [] for name in ('amount', 'overdue_days', 'dca_performance', 'priority', 'recovery_probability')}
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(query)
+            for rows in result.partitions():
+                amount, overdue_days, performance, priority, recovery = zip(*rows)
+                chunks['amount'].append(np.array(amount, dtype=float))
+                chunks['overdue_days'].append(np.array(overdue_days, dtype=float))
+                chunks['dca_performance'].append(np.array(performance, dtype=float))
+                chunks['priority'].append(np.array(priority, dtype=object))
+                # None becomes NaN
+                chunks['recovery_probability'].append(np.array(recovery, dtype=float))
+    finally:
+        engine.dispose()
+
+    columns = {
+        name: np.concatenate(parts) if parts else np.array([], dtype=object if name == 'priority' else float)
+        for name, parts in chunks.items()
+    }
+    n_rows = len(columns['amount'])
+    columns['customer_segment'] = np.zeros(n_rows)
+    columns['previous_defaults'] = np.zeros(n_rows)
+    return columns
+
+
+def _json_params(estimator):
+    return {k: v for k, v in estimator.get_params().items() if isinstance(v, (int, float, str, bool, type(None)))}
+
+
+def _single_threaded(estimator):
+    # Folds already run in parallel; don't nest a second pool inside each
+    estimator = clone(estimator)
+    if 'n_jobs' in estimator.get_params():
+        estimator.set_params(n_jobs=1)
+    return estimator
+
+
+def train(name, estimator, columns, features, y, scoring, args, timings):
+    """Fit, cross-validate, evaluate and publish one model; returns its metadata"""
+    X = np.column_stack([columns[f] for f in features]).astype(float)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=args.test_size, random_state=args.seed)
+
+    start = time.perf_counter()
+    cv_X, cv_y = X_train, y_train
+    if len(X_train) > args.cv_rows:
+        sample = np.random.default_rng(args.seed).choice(len(X_train), args.cv_rows, replace=False)
+        cv_X, cv_y = X_train[sample], y_train[sample]
+    cv = cross_validate(
+        make_pipeline(StandardScaler(), _single_threaded(estimator)),
+        cv_X, cv_y, cv=args.folds, scoring=scoring, n_jobs=args.jobs,
+    )
+    timings['cross_validate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scaler = StandardScaler().fit(X_train)
+    model = clone(estimator).fit(scaler.transform(X_train), y_train)
+    timings['fit'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    X_test_scaled = scaler.transform(X_test)
+    metrics = {
+        metric: float(get_scorer(metric)(model, X_test_scaled, y_test))
+        for metric in scoring
+    }
+    timings['evaluate'] = time.perf_counter() - start
+
+    version = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    out_dir = os.path.join(MODEL_DIR, 'versions', name, version)
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    joblib.dump(model, os.path.join(out_dir, 'model.pkl'))
+    joblib.dump(scaler, os.path.join(out_dir, 'scaler.pkl'))
+    timings['save'] = time.perf_counter() - start
+
+    metadata = {
+        'name': name,
+        'version': version,
+        'created_at': datetime.utcnow().isoformat(),
+        'source': args.source,
+        'labels': 'rules' if args.source == 'synthetic' else args.labels,
+        'features': list(features),
+        'estimator': type(model).__name__,
+        'params': _json_params(model),
+        'rows': {'total': len(X), 'train': len(X_train), 'test': len(X_test), 'cross_validation': len(cv_X)},
+        'metrics': {'test': metrics, 'cross_validation': {
+            metric: {'mean': float(np.mean(cv[f'test_{metric}'])), 'std': float(np.std(cv[f'test_{metric}']))}
+            for metric in scoring
+        }},
+        'feature_importances': dict(zip(features, map(float, model.feature_importances_))),
+        'timings_seconds': {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        'sklearn_version': sklearn.__version__,
+        'model_sha1': file_sha1(os.path.join(out_dir, 'model.pkl')),
+    }
+    with open(os.path.join(out_dir, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    publish(name, out_dir)
+    return metadata
+
+
+def publish(name, version_dir):
+    """Copy a trained version over the files the backend loads, each atomically"""
+    for source, target in (
+        ('scaler.pkl', f'{name}_scaler.pkl'),
+        ('model.pkl', f'{name}_model.pkl'),
+        ('metadata.json', f'{name}_model.json'),
+    ):
+        target_path = os.path.join(MODEL_DIR, target)
+        shutil.copyfile(os.path.join(version_dir, source), target_path + '.tmp')
+        os.replace(target_path + '.tmp', target_path)
+
+
+def build_parser(description):
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', choices=['synthetic', 'db'], default='synthetic',
+                        help='generate rows, or read them from the cases table')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL))
+    parser.add_argument('--labels', choices=['stored', 'rules'], default='stored',
+                        help="with --source db: learn the cases' stored labels, or derive them by the business rules")
+    parser.add_argument('--rows', type=int, default=1000, help='synthetic rows to generate')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--cv-rows', type=int, default=500_000, help='cross-validate on at most this many rows')
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--jobs', type=int, default=-1, help='parallel workers (-1: all cores)')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser
+
+
+def load(args, timings):
+    """Training columns for the chosen source"""
+    start = time.perf_counter()
+    if args.source == 'db':
+        columns = load_cases(args.database_url, args.chunk_rows)
+    else:
+        columns = synthetic_cases(args.rows, args.seed)
+    timings['load'] = time.perf_counter() - start
+    if len(columns['amount']) == 0:
+        sys.exit('no training rows')
+    return columns
+
+
+def select_rows(columns, mask):
+    return {name: values[mask] for name, values in columns.items()}
+
+
+def report(metadata):
+    print(f"{metadata['name']} model {metadata['version']} ({metadata['estimator']})")
+    print(f"  rows: {metadata['rows']}")
+    for metric, value in metadata['metrics']['test'].items():
+        cv = metadata['metrics']['cross_validation'][metric]
+        print(f"  {metric}: test {value:.4f}, cv {cv['mean']:.4f} +/- {cv['std']:.4f}")
+    importances = sorted(metadata['feature_importances'].items(), key=lambda item: -item[1])
+    print('  feature importance: ' + ', '.join(f'{f} {v:.3f}' for f, v in importances))
+    print('  timings (s): ' + ', '.join(f'{k} {v}' for k, v in metadata['timings_seconds'].items()))
+    print(f"  saved to {os.path.join(MODEL_DIR, 'versions', metadata['name'], metadata['version'])}")
+    print(f"  published as {os.path.join(MODEL_DIR, metadata['name'] + '_model.pkl')}; run export_trees.py to publish its bundle")
@@ -0,0 +1,89 @@
+"""Parity of the compiled tree evaluator (backend/app/tree_eval.py) with sklearn"""
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'ml'))
+
+from app import tree_eval
+from app.model_bundle import ModelBundle, write_bundle
+from app.tree_eval import CompiledEnsemble
+from export_trees import flatten_ensemble, sample_features
+
+TOLERANCE = 1e-9
+
+
+def compile_model(model, scaler):
+    arrays = flatten_ensemble(model, scaler)
+    arrays['source_sha1'] = np.array('0' * 40)
+    return arrays
+
+
+@pytest.fixture(scope='module')
+def forest():
+    X = sample_features(4, 2000, seed=1)
+    y = np.select([(X[:, 0] > 50000) | (X[:, 1] > 90), (X[:, 0] > 20000) | (X[:, 1] > 60)],
+                  ['High', 'Medium'], default='Low')
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0).fit(scaler.transform(X), y)
+    return model, scaler
+
+
+@pytest.fixture(scope='module')
+def boosting():
+    X = sample_features(5, 2000, seed=2)
+    y = 0.8 - 0.003 * X[:, 1] - 0.000001 * X[:, 0] + 0.1 * X[:, 4]
+    scaler = StandardScaler().fit(X)
+    model = GradientBoostingRegressor(n_estimators=30, max_depth=4, random_state=0).fit(scaler.transform(X), y)
+    return model, scaler
+
+
+@pytest.mark.parametrize('n_rows', [1, 7, 64, 1000])
+def test_forest_matches_sklearn(forest, n_rows):
+    model, scaler = forest
+    compiled = CompiledEnsemble(compile_model(model, scaler))
+    X = sample_features(4, n_rows, seed=3)
+
+    expected = model.predict_proba(scaler.transform(X))
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, rtol=TOLERANCE, atol=TOLERANCE)
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(scaler.transform(X)))
+
+
+@pytest.mark.parametrize('n_rows', [1, 7, 64, 1000])
+def test_boosting_matches_sklearn(boosting, n_rows):
+    model, scaler = boosting
+    compiled = CompiledEnsemble(compile_model(model, scaler))
+    X = sample_features(5, n_rows, seed=4)
+
+    expected = model.predict(scaler.transform(X))
+    np.testing.assert_allclose(compiled.predict(X), expected, rtol=TOLERANCE, atol=TOLERANCE)
+
+
+def test_chunked_batches_match_sklearn(forest, boosting, monkeypatch):
+    monkeypatch.setattr(tree_eval, 'CHUNK_ROWS', 100)
+    for (model, scaler), n_features in ((forest, 4), (boosting, 5)):
+        compiled = CompiledEnsemble(compile_model(model, scaler))
+        X = sample_features(n_features, 1050, seed=5)
+        if compiled.kind == 'classifier':
+            actual, expected = compiled.predict_proba(X), model.predict_proba(scaler.transform(X))
+        else:
+            actual, expected = compiled.predict(X), model.predict(scaler.transform(X))
+        np.testing.assert_allclose(actual, expected, rtol=TOLERANCE, atol=TOLERANCE)
+
+
+def test_bundle_round_trip(forest, tmp_path):
+    model, scaler = forest
+    arrays = compile_model(model, scaler)
+    bundle = ModelBundle.open(write_bundle(str(tmp_path), 'priority', arrays, ['a', 'b', 'c', 'd']))
+    assert not bundle.mapped
+
+    X = sample_features(4, 200, seed=6)
+    np.testing.assert_allclose(bundle.ensemble.predict_proba(X), model.predict_proba(scaler.transform(X)),
+                               rtol=TOLERANCE, atol=TOLERANCE)
+    assert bundle.mapped
+    assert isinstance(bundle.ensemble.feature, np.memmap)